@@ -3,12 +3,11 @@ import logging
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
-from flask_socketio import SocketIO
 # Removed Flask-RESTX to prevent routing conflicts
-from apscheduler.schedulers.background import BackgroundScheduler
+from sqlalchemy import delete, event, func, inspect, select
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
-import atexit
 from datetime import timedelta
 
 class Base(DeclarativeBase):
@@ -17,9 +16,30 @@ class Base(DeclarativeBase):
 # Initialize extensions
 db = SQLAlchemy(model_class=Base)
 jwt = JWTManager()
-socketio = SocketIO()
 # Removed api = Api() to prevent routing conflicts
-scheduler = BackgroundScheduler()
+# Background scheduler is created by start_scheduler (see below)
+scheduler = None
+_scheduler_lock_file = None
+
+# Per-connection SQLite settings: WAL lets dashboard reads run alongside sync
+# writes, NORMAL sync is safe under WAL, and a 64 MiB page cache / 256 MiB
+# mmap keep the activity tables in memory for analytics queries.
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA cache_size=-65536',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA mmap_size=268435456',
+)
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply SQLITE_PRAGMAS to each new DBAPI connection"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
 
 def create_app():
     app = Flask(__name__, template_folder='../templates')
@@ -27,9 +47,10 @@ def create_app():
     # Apply proxy fix for Replit
     app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
     
-    # Load environment variables from .env file
-    from dotenv import load_dotenv
-    load_dotenv()
+    # Load environment variables from .env file (production gets real env vars)
+    if os.environ.get('FLASK_ENV') != 'production':
+        from dotenv import load_dotenv
+        load_dotenv()
     
     # Load configuration
     from app.config import Config
@@ -42,8 +63,6 @@ def create_app():
     # Initialize extensions
     db.init_app(app)
     jwt.init_app(app)
-    # Disabled SocketIO to improve performance and fix timeout issues
-    # socketio.init_app(app, cors_allowed_origins="*")
     # Removed Flask-RESTX initialization to prevent routing conflicts
     
     # Configure JWT
@@ -70,44 +89,128 @@ def create_app():
     
     # Create database tables
     with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            event.listen(db.engine, 'connect', _set_sqlite_pragmas)
+        
         # Import models to ensure they are registered
         from app import models
         db.create_all()
         
+        # create_all() skips existing tables, so add any newer indexes explicitly
+        _dedupe_daily_summaries()
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                try:
+                    index.create(bind=db.engine, checkfirst=True)
+                except SQLAlchemyError as e:
+                    logging.error(f"Could not create index {index.name}: {str(e)}")
+        
         # Log successful database initialization
         logging.info("Database tables created successfully")
     
-    # Setup scheduler for background tasks
-    if not scheduler.running:
-        from app.processing_workflows import replit_daily_processing
-        from datetime import datetime
-        
-        # Schedule daily processing at 3 AM
-        scheduler.add_job(
-            func=lambda: replit_daily_processing(datetime.now().date()),
-            trigger='cron',
-            hour=3,
-            minute=0,
-            id='daily_processing'
-        )
-        
-        # Schedule athlete updates every 5 minutes for better performance
-        from app.simple_routes import send_athlete_update
-        scheduler.add_job(
-            func=send_athlete_update,
-            trigger='interval',
-            minutes=5,
-            id='athlete_updates'
-        )
-        
-        scheduler.start()
-        logging.info("Background scheduler started")
-        
-        # Shutdown scheduler when app exits
-        atexit.register(lambda: scheduler.shutdown())
-    
     return app
 
+def _dedupe_daily_summaries():
+    """Keep only the newest summary per athlete and day so the unique index can be built on older databases"""
+    from app.models import DailySummary
+    
+    table_name = DailySummary.__tablename__
+    inspector = inspect(db.engine)
+    if not inspector.has_table(table_name) or any(
+        index['name'] == 'uq_daily_summary_athlete_date' for index in inspector.get_indexes(table_name)
+    ):
+        return
+    
+    newest_ids = select(func.max(DailySummary.id)).group_by(DailySummary.athlete_id, DailySummary.summary_date)
+    with db.engine.begin() as connection:
+        removed = connection.execute(delete(DailySummary).where(DailySummary.id.not_in(newest_ids))).rowcount
+    if removed:
+        logging.warning(f"Removed {removed} duplicate daily summaries before adding the unique index")
+
+def _acquire_scheduler_lock():
+    """Take a non-blocking, process-lifetime lock so only one process runs scheduled jobs"""
+    global _scheduler_lock_file
+    
+    try:
+        import fcntl
+    except ImportError:
+        # Non-POSIX platforms fall back to one scheduler per process
+        return True
+    
+    import tempfile
+    lock_path = os.environ.get(
+        'SCHEDULER_LOCK_FILE',
+        os.path.join(tempfile.gettempdir(), 'marathon_scheduler.lock')
+    )
+    lock_file = open(lock_path, 'w')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    
+    # Keep the descriptor open - the lock is released when this process exits
+    _scheduler_lock_file = lock_file
+    return True
+
+def start_scheduler(app):
+    """
+    Start the background scheduler for daily processing and athlete updates.
+    
+    Called from gunicorn's post_worker_init hook (see gunicorn.conf.py) and from
+    main.py for the development server. Only the first process to take the
+    scheduler lock runs the jobs, so multiple workers do not repeat them.
+    """
+    global scheduler
+    
+    if scheduler is not None:
+        return scheduler
+    
+    if not _acquire_scheduler_lock():
+        logging.info("Background scheduler is running in another process")
+        return None
+    
+    import atexit
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from app.processing_workflows import replit_daily_processing
+    from app.simple_routes import send_athlete_update
+    from datetime import datetime
+    
+    # Collapse backed-up runs into one and never overlap a job with itself
+    scheduler = BackgroundScheduler(job_defaults={
+        'coalesce': True,
+        'max_instances': 1,
+        'misfire_grace_time': app.config.get('SCHEDULER_MISFIRE_GRACE_TIME', 60)
+    })
+    
+    # Schedule daily processing at 3 AM
+    scheduler.add_job(
+        func=lambda: replit_daily_processing(datetime.now().date()),
+        trigger='cron',
+        hour=3,
+        minute=0,
+        id='daily_processing',
+        replace_existing=True
+    )
+    
+    # Schedule athlete updates every 5 minutes for better performance
+    scheduler.add_job(
+        func=send_athlete_update,
+        trigger='interval',
+        minutes=5,
+        id='athlete_updates',
+        replace_existing=True
+    )
+    
+    scheduler.start()
+    logging.info("Background scheduler started")
+    
+    # Shutdown scheduler when app exits
+    atexit.register(scheduler.shutdown)
+    
+    app.scheduler = scheduler
+    return scheduler
+
 # Global error handler
 def register_error_handlers(app):
     @app.errorhandler(Exception)
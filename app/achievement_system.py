@@ -4,14 +4,112 @@ Generates dynamic achievement stickers based on athlete performance, training co
 """
 
 import logging
+import threading
+from itertools import groupby
+from operator import attrgetter
+from string import Template
+import numpy as np
+import orjson
+from cachetools import TTLCache
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 from sqlalchemy.orm import Session
 from app.models import ReplitAthlete, Activity, db
 from app.training_load_calculator import get_training_load_metrics
+from app.config import Config
+try:
+    import redis  # type: ignore
+except ImportError:
+    redis = None
 
 logger = logging.getLogger(__name__)
 
+# Only the columns the achievement checks read - avoids hydrating full Activity objects
+ACTIVITY_STATS_COLUMNS = (
+    Activity.start_date,
+    Activity.distance,
+    Activity.moving_time,
+    Activity.sport_type,
+    Activity.average_heartrate,
+)
+
+# Sticker markup; $emoji also keys the gradient/shadow ids
+STICKER_SVG_TEMPLATE = Template('''
+        <svg width="80" height="80" viewBox="0 0 80 80" xmlns="http://www.w3.org/2000/svg">
+            <defs>
+                <linearGradient id="gradient-$emoji" x1="0%" y1="0%" x2="100%" y2="100%">
+                    <stop offset="0%" style="stop-color:$color;stop-opacity:1" />
+                    <stop offset="100%" style="stop-color:$darkened;stop-opacity:1" />
+                </linearGradient>
+                <filter id="shadow-$emoji" x="-50%" y="-50%" width="200%" height="200%">
+                    <feDropShadow dx="2" dy="2" stdDeviation="3" flood-color="rgba(0,0,0,0.3)"/>
+                </filter>
+            </defs>
+            <circle cx="40" cy="40" r="35" fill="url(#gradient-$emoji)" 
+                    filter="url(#shadow-$emoji)" stroke="white" stroke-width="3"/>
+            <text x="40" y="50" text-anchor="middle" font-size="24" fill="white">$emoji</text>
+            <circle cx="40" cy="40" r="35" fill="none" stroke="white" stroke-width="2" opacity="0.6"/>
+        </svg>
+        ''')
+
+@dataclass(slots=True)
+class ActivityStats:
+    """Aggregates collected in a single pass over an athlete's activities"""
+    activity_count: int = 0
+    latest_date: Optional[datetime] = None
+    max_distance_km: float = 0.0
+    first_distance_dates: Dict[float, datetime] = field(default_factory=dict)
+    # Day ordinals (date.toordinal) gathered during the scan
+    training_days: List[int] = field(default_factory=list)
+    distance_days: List[int] = field(default_factory=list)
+    distance_values_km: List[float] = field(default_factory=list)
+    # Derived with NumPy once the scan completes
+    weekly_totals: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    max_streak: int = 0
+    early_runs: int = 0
+    sports: Set[str] = field(default_factory=set)
+    hr_sum: float = 0.0
+    hr_count: int = 0
+    max_tennis_seconds: int = 0
+    run_5k_samples: List[Tuple[datetime, float]] = field(default_factory=list)
+    
+    def to_cache(self) -> bytes:
+        """Serialize the derived aggregates (raw day lists are not needed once derived)"""
+        return orjson.dumps({
+            'activity_count': self.activity_count,
+            'latest_date': self.latest_date.isoformat() if self.latest_date else None,
+            'max_distance_km': self.max_distance_km,
+            'first_distance_dates': [[t, d.isoformat()] for t, d in self.first_distance_dates.items()],
+            'weekly_totals': self.weekly_totals.tolist(),
+            'max_streak': self.max_streak,
+            'early_runs': self.early_runs,
+            'sports': sorted(self.sports),
+            'hr_sum': self.hr_sum,
+            'hr_count': self.hr_count,
+            'max_tennis_seconds': self.max_tennis_seconds,
+            'run_5k_samples': [[d.isoformat(), pace] for d, pace in self.run_5k_samples]
+        })
+    
+    @classmethod
+    def from_cache(cls, payload) -> 'ActivityStats':
+        """Rebuild stats serialized by to_cache"""
+        data = orjson.loads(payload)
+        return cls(
+            activity_count=data['activity_count'],
+            latest_date=datetime.fromisoformat(data['latest_date']) if data['latest_date'] else None,
+            max_distance_km=data['max_distance_km'],
+            first_distance_dates={t: datetime.fromisoformat(d) for t, d in data['first_distance_dates']},
+            weekly_totals=np.asarray(data['weekly_totals'], dtype=np.float64),
+            max_streak=data['max_streak'],
+            early_runs=data['early_runs'],
+            sports=set(data['sports']),
+            hr_sum=data['hr_sum'],
+            hr_count=data['hr_count'],
+            max_tennis_seconds=data['max_tennis_seconds'],
+            run_5k_samples=[(datetime.fromisoformat(d), pace) for d, pace in data['run_5k_samples']]
+        )
+
 class AchievementSystem:
     """
     Advanced achievement system that recognizes training patterns, milestones, and improvements
@@ -158,256 +256,401 @@ class AchievementSystem:
                 'threshold': 80
             }
         }
+        
+        # Requirement -> checker(stats, threshold) dispatch table
+        self._checkers = {
+            'single_distance': self._check_single_distance,
+            'weekly_distance': self._check_weekly_distance,
+            'streak': self._check_streak,
+            'early_runs': self._check_early_runs,
+            'pace_improvement': self._check_pace_improvement,
+            'distance_improvement': self._check_distance_improvement,
+            'sport_variety': self._check_sport_variety,
+            'tennis_duration': self._check_tennis_duration,
+            'heart_rate_zone': self._check_heart_rate_zone
+        }
+        
+        # Stickers depend only on the definition, so render them once up front
+        for achievement in self.achievements.values():
+            achievement['sticker_svg'] = self._generate_sticker_svg(achievement)
+        
+        # Short-lived cache of earned achievements keyed by (athlete_id, days_back)
+        self._achievement_cache = TTLCache(maxsize=10000, ttl=60)
+        self._cache_lock = threading.Lock()
+        
+        # Aggregated stats shared across workers via Redis (when REDIS_URL is set)
+        self._redis = None
+        self._stats_ttl = 3600
+    
+    def clear_cache(self):
+        """Clear the achievement cache"""
+        with self._cache_lock:
+            self._achievement_cache.clear()
+    
+    def invalidate_athlete(self, athlete_id: int):
+        """Drop cached achievements for an athlete after their activities change"""
+        with self._cache_lock:
+            for key in [key for key in self._achievement_cache if key[0] == athlete_id]:
+                self._achievement_cache.pop(key, None)
+        
+        redis_client = self._get_redis()
+        if redis_client is not None:
+            try:
+                redis_client.delete(self._stats_key(athlete_id))
+            except Exception as e:
+                logger.warning(f"Failed to invalidate cached stats for athlete {athlete_id}: {str(e)}")
+    
+    def _get_redis(self):
+        """Connect to Redis lazily; returns None when Redis is not configured"""
+        if self._redis is None and redis is not None and Config.REDIS_URL:
+            self._redis = redis.Redis.from_url(Config.REDIS_URL, socket_timeout=0.5)
+        return self._redis
+    
+    def _stats_key(self, athlete_id: int) -> str:
+        """Redis hash holding an athlete's stats, one field per days_back window"""
+        return f"ach:stats:{athlete_id}"
+    
+    def _load_activity_stats(self, athlete_id: int, days_back: int) -> 'ActivityStats':
+        """Load aggregated stats from Redis, falling back to the database"""
+        redis_client = self._get_redis()
+        if redis_client is not None:
+            try:
+                payload = redis_client.hget(self._stats_key(athlete_id), days_back)
+                if payload:
+                    return ActivityStats.from_cache(payload)
+            except Exception as e:
+                logger.warning(f"Failed to read cached stats for athlete {athlete_id}: {str(e)}")
+        
+        # Stream athlete activities in batches so memory stays bounded for heavy athletes
+        cutoff_date = datetime.now() - timedelta(days=days_back)
+        activities = db.session.query(*ACTIVITY_STATS_COLUMNS).filter(
+            Activity.athlete_id == athlete_id,
+            Activity.start_date >= cutoff_date
+        ).order_by(Activity.start_date.desc()).yield_per(500)
+        
+        # Aggregate everything the achievement checks need in a single pass
+        stats = self._collect_activity_stats(activities)
+        self._store_activity_stats({athlete_id: stats}, days_back)
+        return stats
+    
+    def _store_activity_stats(self, stats_by_athlete: Dict[int, 'ActivityStats'], days_back: int):
+        """Write aggregated stats to Redis in one pipeline"""
+        redis_client = self._get_redis()
+        if redis_client is None or not stats_by_athlete:
+            return
+        
+        try:
+            pipeline = redis_client.pipeline(transaction=False)
+            for athlete_id, stats in stats_by_athlete.items():
+                key = self._stats_key(athlete_id)
+                pipeline.hset(key, days_back, stats.to_cache())
+                pipeline.expire(key, self._stats_ttl)
+            pipeline.execute()
+        except Exception as e:
+            logger.warning(f"Failed to cache stats for {len(stats_by_athlete)} athletes: {str(e)}")
     
     def get_athlete_achievements(self, athlete_id: int, days_back: int = 90) -> List[Dict]:
         """
         Get all achievements earned by an athlete
         """
+        cache_key = (athlete_id, days_back)
+        with self._cache_lock:
+            cached = self._achievement_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+        
         try:
-            # Get athlete activities
-            cutoff_date = datetime.now() - timedelta(days=days_back)
-            activities = db.session.query(Activity).filter(
-                Activity.athlete_id == athlete_id,
-                Activity.start_date >= cutoff_date
-            ).order_by(Activity.start_date.desc()).all()
+            stats = self._load_activity_stats(athlete_id, days_back)
+            earned_achievements = self._build_earned_achievements(stats)
             
-            if not activities:
-                return []
+            logger.info(f"Generated {len(earned_achievements)} achievements for athlete {athlete_id}")
+            with self._cache_lock:
+                self._achievement_cache[cache_key] = earned_achievements
+            return list(earned_achievements)
+            
+        except Exception as e:
+            logger.error(f"Error getting achievements for athlete {athlete_id}: {str(e)}")
+            return []
+    
+    def get_achievements_for_athletes(self, athlete_ids: Iterable[int], days_back: int = 90) -> Dict[int, List[Dict]]:
+        """
+        Get achievements for many athletes with a single activity query
+        """
+        results = {}
+        missing_ids = []
+        
+        with self._cache_lock:
+            for athlete_id in set(athlete_ids):
+                cached = self._achievement_cache.get((athlete_id, days_back))
+                if cached is not None:
+                    results[athlete_id] = list(cached)
+                else:
+                    missing_ids.append(athlete_id)
+        
+        if not missing_ids:
+            return results
+        
+        try:
+            stats_by_athlete = self._load_cached_stats_many(missing_ids, days_back)
+            uncached_ids = [athlete_id for athlete_id in missing_ids if athlete_id not in stats_by_athlete]
             
-            earned_achievements = []
+            if uncached_ids:
+                cutoff_date = datetime.now() - timedelta(days=days_back)
+                rows = db.session.query(Activity.athlete_id, *ACTIVITY_STATS_COLUMNS).filter(
+                    Activity.athlete_id.in_(uncached_ids),
+                    Activity.start_date >= cutoff_date
+                ).order_by(Activity.athlete_id, Activity.start_date.desc()).yield_per(500)
+                
+                queried = {athlete_id: ActivityStats() for athlete_id in uncached_ids}
+                for athlete_id, athlete_rows in groupby(rows, key=attrgetter('athlete_id')):
+                    queried[athlete_id] = self._collect_activity_stats(athlete_rows)
+                
+                self._store_activity_stats(queried, days_back)
+                stats_by_athlete.update(queried)
             
-            # Check each achievement type
-            for achievement_id, achievement in self.achievements.items():
-                if self._check_achievement(achievement, activities, athlete_id):
-                    earned_achievements.append({
-                        'id': achievement_id,
-                        'name': achievement['name'],
-                        'description': achievement['description'],
-                        'category': achievement['category'],
-                        'emoji': achievement['emoji'],
-                        'color': achievement['color'],
-                        'earned_date': self._get_achievement_date(achievement, activities),
-                        'sticker_data': self._generate_sticker_svg(achievement)
-                    })
+            computed = {
+                athlete_id: self._build_earned_achievements(stats)
+                for athlete_id, stats in stats_by_athlete.items()
+            }
             
-            # Sort by earned date (most recent first)
-            earned_achievements.sort(key=lambda x: x['earned_date'], reverse=True)
+            with self._cache_lock:
+                for athlete_id, earned_achievements in computed.items():
+                    self._achievement_cache[(athlete_id, days_back)] = earned_achievements
             
-            logger.info(f"Generated {len(earned_achievements)} achievements for athlete {athlete_id}")
-            return earned_achievements
+            for athlete_id, earned_achievements in computed.items():
+                results[athlete_id] = list(earned_achievements)
+            
+            logger.info(f"Generated achievements for {len(computed)} athletes in one batch")
             
         except Exception as e:
-            logger.error(f"Error getting achievements for athlete {athlete_id}: {str(e)}")
-            return []
+            logger.error(f"Error getting batched achievements for {len(missing_ids)} athletes: {str(e)}")
+            for athlete_id in missing_ids:
+                results.setdefault(athlete_id, [])
+        
+        return results
     
-    def _check_achievement(self, achievement: Dict, activities: List[Activity], athlete_id: int) -> bool:
-        """Check if an achievement has been earned"""
-        requirement = achievement['requirement']
-        threshold = achievement['threshold']
+    def _load_cached_stats_many(self, athlete_ids: List[int], days_back: int) -> Dict[int, 'ActivityStats']:
+        """Fetch cached stats for several athletes from Redis in one pipeline"""
+        redis_client = self._get_redis()
+        if redis_client is None:
+            return {}
         
         try:
-            if requirement == 'single_distance':
-                # Check if any single activity meets distance threshold
-                return any(
-                    (activity.distance or 0) / 1000 >= threshold 
-                    for activity in activities
-                )
+            pipeline = redis_client.pipeline(transaction=False)
+            for athlete_id in athlete_ids:
+                pipeline.hget(self._stats_key(athlete_id), days_back)
+            payloads = pipeline.execute()
+        except Exception as e:
+            logger.warning(f"Failed to read cached stats for {len(athlete_ids)} athletes: {str(e)}")
+            return {}
+        
+        return {
+            athlete_id: ActivityStats.from_cache(payload)
+            for athlete_id, payload in zip(athlete_ids, payloads) if payload
+        }
+    
+    def _build_earned_achievements(self, stats: 'ActivityStats') -> List[Dict]:
+        """Evaluate every achievement against aggregated stats, most recent first"""
+        if stats.activity_count == 0:
+            return []
+        
+        earned_achievements = []
+        
+        # Check each achievement type against the aggregated stats
+        for achievement_id, achievement in self.achievements.items():
+            if self._check_achievement(achievement, stats):
+                earned_achievements.append({
+                    'id': achievement_id,
+                    'name': achievement['name'],
+                    'description': achievement['description'],
+                    'category': achievement['category'],
+                    'emoji': achievement['emoji'],
+                    'color': achievement['color'],
+                    'earned_date': self._get_achievement_date(achievement, stats),
+                    'sticker_data': achievement['sticker_svg']
+                })
+        
+        # Sort by earned date (most recent first)
+        earned_achievements.sort(key=lambda x: x['earned_date'], reverse=True)
+        return earned_achievements
+    
+    def _collect_activity_stats(self, activities: Iterable[Activity]) -> 'ActivityStats':
+        """
+        Traverse activities once (most recent first) and accumulate the aggregates
+        used by every achievement requirement
+        """
+        stats = ActivityStats()
+        distance_thresholds = sorted(
+            achievement['threshold'] for achievement in self.achievements.values()
+            if achievement['requirement'] == 'single_distance'
+        )
+        
+        for activity in activities:
+            stats.activity_count += 1
+            start_date = activity.start_date
+            distance_km = (activity.distance or 0) / 1000
+            sport_type = activity.sport_type
+            
+            if stats.latest_date is None:
+                stats.latest_date = start_date
             
-            elif requirement == 'weekly_distance':
-                # Check weekly distance totals
-                return self._check_weekly_distance(activities, threshold)
+            # Single distance - activities arrive newest first, so the last
+            # qualifying activity seen is the oldest one
+            stats.max_distance_km = max(stats.max_distance_km, distance_km)
+            for threshold in distance_thresholds:
+                if distance_km < threshold:
+                    break
+                stats.first_distance_dates[threshold] = start_date
             
-            elif requirement == 'streak':
-                # Check consecutive training days
-                return self._calculate_max_streak(activities) >= threshold
+            if sport_type:
+                stats.sports.add(sport_type)
             
-            elif requirement == 'early_runs':
-                # Check morning runs before 7 AM
-                early_runs = sum(
-                    1 for activity in activities 
-                    if activity.start_date and activity.start_date.hour < 7
-                    and activity.sport_type == 'Run'
-                )
-                return early_runs >= threshold
+            if sport_type == 'Tennis':
+                stats.max_tennis_seconds = max(stats.max_tennis_seconds, activity.moving_time or 0)
             
-            elif requirement == 'pace_improvement':
-                # Check 5K pace improvement
-                return self._check_pace_improvement(activities, threshold)
+            if activity.average_heartrate and activity.average_heartrate > 0:
+                stats.hr_sum += activity.average_heartrate
+                stats.hr_count += 1
             
-            elif requirement == 'distance_improvement':
-                # Check weekly distance improvement
-                return self._check_distance_improvement(activities, threshold)
+            if not start_date:
+                continue
             
-            elif requirement == 'sport_variety':
-                # Check number of different sports
-                sports = set(activity.sport_type for activity in activities if activity.sport_type)
-                return len(sports) >= threshold
+            day = start_date.toordinal()
+            stats.training_days.append(day)
             
-            elif requirement == 'tennis_duration':
-                # Check tennis session duration
-                return any(
-                    activity.sport_type == 'Tennis' and (activity.moving_time or 0) >= threshold * 60
-                    for activity in activities
-                )
+            if start_date.hour < 7 and sport_type == 'Run':
+                stats.early_runs += 1
             
-            elif requirement == 'heart_rate_zone':
-                # Check heart rate zone consistency
-                hr_activities = [a for a in activities if a.average_heartrate and a.average_heartrate > 0]
-                if len(hr_activities) < 5:
-                    return False
-                avg_hr = sum(a.average_heartrate for a in hr_activities) / len(hr_activities)
-                return avg_hr >= threshold
+            if activity.distance:
+                stats.distance_days.append(day)
+                stats.distance_values_km.append(distance_km)
             
+            # 5K-ish runs (4.5km to 6km) for pace tracking
+            if (sport_type == 'Run' and activity.distance
+                    and 4500 <= activity.distance <= 6000
+                    and activity.moving_time and activity.moving_time > 0):
+                stats.run_5k_samples.append((start_date, activity.moving_time / distance_km))
+        
+        stats.weekly_totals = self._calculate_weekly_totals(stats.distance_days, stats.distance_values_km)
+        stats.max_streak = self._calculate_max_streak(stats.training_days)
+        return stats
+    
+    def _check_achievement(self, achievement: Dict, stats: 'ActivityStats') -> bool:
+        """Check if an achievement has been earned"""
+        checker = self._checkers.get(achievement['requirement'])
+        if checker is None:
             return False
-            
+        
+        try:
+            return checker(stats, achievement['threshold'])
         except Exception as e:
             logger.error(f"Error checking achievement {achievement.get('name', 'unknown')}: {str(e)}")
             return False
     
-    def _check_weekly_distance(self, activities: List[Activity], threshold: float) -> bool:
+    def _check_single_distance(self, stats: 'ActivityStats', threshold: float) -> bool:
+        """Check if any single activity meets distance threshold"""
+        return stats.max_distance_km >= threshold
+    
+    def _check_streak(self, stats: 'ActivityStats', threshold: int) -> bool:
+        """Check consecutive training days"""
+        return stats.max_streak >= threshold
+    
+    def _check_early_runs(self, stats: 'ActivityStats', threshold: int) -> bool:
+        """Check morning runs before 7 AM"""
+        return stats.early_runs >= threshold
+    
+    def _check_sport_variety(self, stats: 'ActivityStats', threshold: int) -> bool:
+        """Check number of different sports"""
+        return len(stats.sports) >= threshold
+    
+    def _check_tennis_duration(self, stats: 'ActivityStats', threshold_minutes: int) -> bool:
+        """Check tennis session duration"""
+        return stats.max_tennis_seconds >= threshold_minutes * 60
+    
+    def _check_heart_rate_zone(self, stats: 'ActivityStats', threshold: float) -> bool:
+        """Check heart rate zone consistency"""
+        if stats.hr_count < 5:
+            return False
+        return stats.hr_sum / stats.hr_count >= threshold
+    
+    def _check_weekly_distance(self, stats: 'ActivityStats', threshold: float) -> bool:
         """Check if any week meets distance threshold"""
-        # Group activities by week
-        weekly_totals = {}
+        return bool((stats.weekly_totals >= threshold).any())
+    
+    def _calculate_weekly_totals(self, day_ordinals: List[int], distances_km: List[float]) -> np.ndarray:
+        """Sum distance per Monday-based week, returned in chronological order"""
+        if not day_ordinals:
+            return np.zeros(0)
         
-        for activity in activities:
-            if not activity.start_date or not activity.distance:
-                continue
-                
-            # Get Monday of the week
-            week_start = activity.start_date - timedelta(days=activity.start_date.weekday())
-            week_key = week_start.strftime('%Y-%W')
-            
-            if week_key not in weekly_totals:
-                weekly_totals[week_key] = 0
-            
-            weekly_totals[week_key] += activity.distance / 1000  # Convert to km
+        # Ordinal 1 (0001-01-01) is a Monday, so (ordinal - 1) // 7 buckets by Monday weeks
+        weeks = (np.fromiter(day_ordinals, dtype=np.int64, count=len(day_ordinals)) - 1) // 7
+        weeks -= weeks.min()
+        totals = np.bincount(weeks, weights=np.asarray(distances_km, dtype=np.float64))
         
-        return any(total >= threshold for total in weekly_totals.values())
+        # Keep only weeks that had activities
+        return totals[np.bincount(weeks) > 0]
     
-    def _calculate_max_streak(self, activities: List[Activity]) -> int:
+    def _calculate_max_streak(self, day_ordinals: List[int]) -> int:
         """Calculate maximum consecutive training days"""
-        if not activities:
-            return 0
-        
-        # Get unique training days
-        training_days = set()
-        for activity in activities:
-            if activity.start_date:
-                training_days.add(activity.start_date.date())
-        
-        if not training_days:
+        if not day_ordinals:
             return 0
         
-        # Sort training days
-        sorted_days = sorted(training_days)
-        
-        max_streak = 1
-        current_streak = 1
+        unique_days = np.unique(np.asarray(day_ordinals, dtype=np.int64))
         
-        for i in range(1, len(sorted_days)):
-            if (sorted_days[i] - sorted_days[i-1]).days == 1:
-                current_streak += 1
-                max_streak = max(max_streak, current_streak)
-            else:
-                current_streak = 1
-        
-        return max_streak
+        # Split the sorted days wherever the gap is not exactly one day
+        breaks = np.flatnonzero(np.diff(unique_days) != 1) + 1
+        bounds = np.concatenate(([0], breaks, [unique_days.size]))
+        return int(np.diff(bounds).max())
     
-    def _check_pace_improvement(self, activities: List[Activity], threshold_seconds: int) -> bool:
+    def _check_pace_improvement(self, stats: 'ActivityStats', threshold_seconds: int) -> bool:
         """Check if 5K pace has improved by threshold seconds"""
-        # Find 5K-ish runs (4.5km to 6km)
-        relevant_runs = [
-            a for a in activities 
-            if a.sport_type == 'Run' 
-            and a.distance 
-            and 4500 <= a.distance <= 6000
-            and a.moving_time
-            and a.moving_time > 0
-        ]
+        relevant_runs = stats.run_5k_samples
         
         if len(relevant_runs) < 2:
             return False
         
-        # Sort by date
-        relevant_runs.sort(key=lambda x: x.start_date)
-        
-        # Calculate paces (seconds per km)
-        first_pace = (relevant_runs[0].moving_time) / (relevant_runs[0].distance / 1000)
-        best_pace = min(
-            (run.moving_time) / (run.distance / 1000) 
-            for run in relevant_runs[-5:]  # Check last 5 runs
-        )
+        # Paces (seconds per km) in date order
+        relevant_runs = sorted(relevant_runs, key=lambda x: x[0])
+        paces = np.fromiter((pace for _, pace in relevant_runs), dtype=np.float64, count=len(relevant_runs))
         
-        improvement = first_pace - best_pace
-        return improvement >= threshold_seconds
+        improvement = paces[0] - paces[-5:].min()  # Best of last 5 runs
+        return bool(improvement >= threshold_seconds)
     
-    def _check_distance_improvement(self, activities: List[Activity], threshold_percentage: float) -> bool:
+    def _check_distance_improvement(self, stats: 'ActivityStats', threshold_percentage: float) -> bool:
         """Check if weekly distance has improved by threshold percentage"""
-        weekly_totals = {}
-        
-        for activity in activities:
-            if not activity.start_date or not activity.distance:
-                continue
-                
-            week_start = activity.start_date - timedelta(days=activity.start_date.weekday())
-            week_key = week_start.strftime('%Y-%W')
-            
-            if week_key not in weekly_totals:
-                weekly_totals[week_key] = 0
-            
-            weekly_totals[week_key] += activity.distance / 1000
-        
-        if len(weekly_totals) < 2:
-            return False
+        weekly_totals = stats.weekly_totals
         
         # Compare recent weeks to earlier weeks
-        sorted_weeks = sorted(weekly_totals.items())
-        if len(sorted_weeks) >= 4:
-            early_avg = sum(dist for _, dist in sorted_weeks[:2]) / 2
-            recent_avg = sum(dist for _, dist in sorted_weeks[-2:]) / 2
+        if weekly_totals.size >= 4:
+            early_avg = weekly_totals[:2].sum() / 2
+            recent_avg = weekly_totals[-2:].sum() / 2
             
             if early_avg > 0:
                 improvement = (recent_avg - early_avg) / early_avg
-                return improvement >= threshold_percentage
+                return bool(improvement >= threshold_percentage)
         
         return False
     
-    def _get_achievement_date(self, achievement: Dict, activities: List[Activity]) -> datetime:
+    def _get_achievement_date(self, achievement: Dict, stats: 'ActivityStats') -> datetime:
         """Get the date when achievement was earned"""
         requirement = achievement['requirement']
         threshold = achievement['threshold']
         
-        # For single distance achievements, find the first qualifying activity
-        if requirement == 'single_distance':
-            for activity in reversed(activities):  # Check oldest first
-                if (activity.distance or 0) / 1000 >= threshold:
-                    return activity.start_date
+        # For single distance achievements, use the first qualifying activity
+        if requirement == 'single_distance' and threshold in stats.first_distance_dates:
+            return stats.first_distance_dates[threshold]
         
         # For other achievements, return most recent activity date
-        return activities[0].start_date if activities else datetime.now()
+        return stats.latest_date if stats.latest_date else datetime.now()
     
     def _generate_sticker_svg(self, achievement: Dict) -> str:
         """Generate SVG sticker data for achievement"""
-        emoji = achievement['emoji']
         color = achievement['color']
-        
-        return f'''
-        <svg width="80" height="80" viewBox="0 0 80 80" xmlns="http://www.w3.org/2000/svg">
-            <defs>
-                <linearGradient id="gradient-{achievement['emoji']}" x1="0%" y1="0%" x2="100%" y2="100%">
-                    <stop offset="0%" style="stop-color:{color};stop-opacity:1" />
-                    <stop offset="100%" style="stop-color:{self._darken_color(color)};stop-opacity:1" />
-                </linearGradient>
-                <filter id="shadow-{achievement['emoji']}" x="-50%" y="-50%" width="200%" height="200%">
-                    <feDropShadow dx="2" dy="2" stdDeviation="3" flood-color="rgba(0,0,0,0.3)"/>
-                </filter>
-            </defs>
-            <circle cx="40" cy="40" r="35" fill="url(#gradient-{achievement['emoji']})" 
-                    filter="url(#shadow-{achievement['emoji']})" stroke="white" stroke-width="3"/>
-            <text x="40" y="50" text-anchor="middle" font-size="24" fill="white">{emoji}</text>
-            <circle cx="40" cy="40" r="35" fill="none" stroke="white" stroke-width="2" opacity="0.6"/>
-        </svg>
-        '''
+        return STICKER_SVG_TEMPLATE.substitute(
+            emoji=achievement['emoji'],
+            color=color,
+            darkened=self._darken_color(color)
+        )
     
     def _darken_color(self, hex_color: str) -> str:
         """Darken a hex color by 20% for gradient effect"""
@@ -421,8 +664,17 @@ class AchievementSystem:
     
     def get_achievement_stats(self, athlete_id: int) -> Dict:
         """Get achievement statistics for an athlete"""
-        achievements = self.get_athlete_achievements(athlete_id)
-        
+        return self._summarize_achievements(self.get_athlete_achievements(athlete_id))
+    
+    def get_achievement_stats_bulk(self, athlete_ids: Iterable[int]) -> Dict[int, Dict]:
+        """Get achievement statistics for many athletes with a single activity query"""
+        return {
+            athlete_id: self._summarize_achievements(achievements)
+            for athlete_id, achievements in self.get_achievements_for_athletes(athlete_ids).items()
+        }
+    
+    def _summarize_achievements(self, achievements: List[Dict]) -> Dict:
+        """Summarize earned achievements by category and completion"""
         # Group by category
         by_category = {}
         for achievement in achievements:
@@ -443,13 +695,21 @@ class AchievementSystem:
             'recent_achievements': achievements[:3]  # Last 3 earned
         }
 
-# Global function for easy access
+# Global instance
+achievement_system = AchievementSystem()
+
 def get_athlete_achievements(athlete_id: int, days_back: int = 90) -> List[Dict]:
     """Get achievements for an athlete"""
-    system = AchievementSystem()
-    return system.get_athlete_achievements(athlete_id, days_back)
+    return achievement_system.get_athlete_achievements(athlete_id, days_back)
 
 def get_achievement_stats(athlete_id: int) -> Dict:
     """Get achievement statistics for an athlete"""
-    system = AchievementSystem()
-    return system.get_achievement_stats(athlete_id)
\ No newline at end of file
+    return achievement_system.get_achievement_stats(athlete_id)
+
+def get_achievement_stats_bulk(athlete_ids: Iterable[int]) -> Dict[int, Dict]:
+    """Get achievement statistics for many athletes"""
+    return achievement_system.get_achievement_stats_bulk(athlete_ids)
+
+def invalidate_athlete_achievements(athlete_id: int):
+    """Invalidate cached achievements after new activities are stored"""
+    achievement_system.invalidate_athlete(athlete_id)
\ No newline at end of file
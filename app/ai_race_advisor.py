@@ -4,19 +4,237 @@ Provides intelligent race recommendations based on training data, performance me
 """
 
 import os
-import json
+import re
+import time
+import asyncio
 import logging
-import hashlib
-from typing import Dict, List, Optional
+import threading
+import weakref
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import orjson
+from cachetools import TTLCache
+from app.config import Config
 try:
     import google.genai as genai  # type: ignore
 except ImportError:
     genai = None
-from datetime import datetime, timedelta
+try:
+    import redis  # type: ignore
+except ImportError:
+    redis = None
+from datetime import datetime
+
+__all__ = ['AIRaceAdvisor', 'get_advisor', 'get_race_recommendations', 'get_race_recommendations_etag',
+           'stream_race_recommendations']
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Maximum athletes per batched Gemini prompt
+_BULK_SIZE = 16
+
+# Maximum concurrent Gemini requests per event loop
+_MAX_CONCURRENCY = 10
+
+# Splits a batched Gemini response into per-athlete sections
+_ATHLETE_SECTION_RE = re.compile(r"###\s*ATHLETE\s*(\d+)\s*###")
+
+# One recommendation per non-heading line, with any "1." / "1)" numbering stripped
+_BULLET_RE = re.compile(r'^\s*(?:\d+[\.\)]\s*)?([^#\s].*?)\s*$', re.M)
+
+_BULK_PROMPT_PREAMBLE = """
+As an enthusiastic marathon coach, analyze each runner's data below and provide encouraging, personalized race recommendations.
+
+For every athlete provide 4-6 encouraging and specific recommendations covering:
+1. Optimal race distance for next 4-6 weeks (based on current weekly volume)
+2. Training focus areas for improvement
+3. Realistic race time predictions (use the athlete's current average pace as baseline - races are only 2-5% faster than training pace)
+4. Recovery and injury prevention advice
+5. Long-term goals based on progression
+6. Next training phase recommendations
+
+IMPORTANT: For race time predictions, be conservative and realistic and use the 5K/10K guide times given for each athlete.
+
+Keep each recommendation to 1-2 sentences, actionable, and motivating.
+Use emojis strategically for visual appeal.
+Be enthusiastic and supportive while staying data-driven and realistic.
+
+Reply with a "### ATHLETE k ###" header line before each athlete's recommendations, using the same k as the input, followed by 4-6 numbered recommendations for that athlete only.
+"""
+
+# Conservative race pace factors: races are typically 2-5% faster than training pace,
+# but never more optimistic than current best pace. Marathon-length races run 2% slower.
+_RACE_FACTORS = {5: 0.97, 10: 0.98, 21.1: 1.02, 42.2: 1.02}
+
+def _race_factor(distance_km: float) -> float:
+    """Race pace factor for distances outside _RACE_FACTORS"""
+    if distance_km <= 5:
+        return 0.97  # 3% faster for 5K
+    elif distance_km <= 10:
+        return 0.98  # 2% faster for 10K
+    elif distance_km <= 21:
+        return 0.99  # 1% faster for half marathon
+    return 1.02  # 2% slower for marathon (endurance challenge)
+
+@lru_cache(maxsize=256)
+def _format_race_time(distance_km: float, avg_pace_min_km: float) -> str:
+    """Predict race time as H:MM:SS or M:SS from training pace and distance"""
+    factor = _RACE_FACTORS.get(distance_km) or _race_factor(distance_km)
+    total_seconds = int(avg_pace_min_km * factor * distance_km * 60)
+    
+    hours, remainder = divmod(total_seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+# Cache bucket widths: coaching advice does not change within these bins,
+# so athletes whose metrics fall in the same bins share AI recommendations
+_DISTANCE_BIN_KM = 5
+_PACE_BIN_MIN_KM = 0.25
+_HEART_RATE_BIN_BPM = 5
+
+def _bucket(value: float, width: float) -> float:
+    """Floor a metric to the lower edge of its cache bin"""
+    return (value // width) * width
+
+# Rule-based fallback policy. A race tier needs both the weekly distance and the
+# pace threshold at that tier, so the tier is the lower of the two bin indices.
+_RACE_DISTANCE_BINS = np.array([20, 35, 50])
+_RACE_PACE_BINS = -np.array([7.0, 6.0, 5.5])
+_RACE_MSGS = [
+    "⚡ 5K focus recommended - build weekly volume first",
+    "🎯 10K race ready - perfect distance for current fitness",
+    "🏃‍♂️ Half Marathon optimal (21.1K) - excellent fitness base",
+    "🏆 Marathon ready! Consider 42.2K race within 8-12 weeks",
+]
+
+# Relative distance to a race-tier threshold within which Gemini is consulted
+_TRIAGE_DISTANCE_MARGIN = 0.10
+_TRIAGE_PACE_MARGIN = 0.05
+
+_HR_BINS = np.array([70, 85])
+_HR_MSGS = [
+    "💚 Excellent aerobic efficiency - maintain this zone",
+    "🟡 Moderate intensity - good for tempo training",
+    "🔴 High intensity detected - ensure adequate recovery",
+]
+_LOAD_BINS = np.array([400, 800])
+_LOAD_MSGS = [
+    "📊 Build training volume gradually for better fitness",
+    "🔄 Solid training volume - maintain consistency",
+    "📈 High training load - consider recovery week",
+]
+
+def _fallback_bulk(weekly_dist: np.ndarray, avg_pace: np.ndarray, hr_intensity: np.ndarray,
+                   load: np.ndarray) -> List[List[str]]:
+    """Rule-based recommendations for many athletes at once"""
+    race_idx = np.minimum(np.searchsorted(_RACE_DISTANCE_BINS, weekly_dist, side='right'),
+                          np.searchsorted(_RACE_PACE_BINS, -avg_pace, side='right'))
+    hr_idx = np.searchsorted(_HR_BINS, hr_intensity, side='right')
+    load_idx = np.searchsorted(_LOAD_BINS, load, side='left')
+    
+    return [
+        [
+            _RACE_MSGS[race],
+            _HR_MSGS[hr],
+            f"🎯 Predicted times: 5K {_format_race_time(5, pace)}, 10K {_format_race_time(10, pace)}",
+            _LOAD_MSGS[load_i],
+        ]
+        for race, hr, load_i, pace in zip(race_idx.tolist(), hr_idx.tolist(), load_idx.tolist(), avg_pace.tolist())
+    ]
+
+_PROMPT_TEMPLATE = """
+            As an enthusiastic marathon coach, analyze this runner's data and provide encouraging, personalized race recommendations.
+            
+            Training Profile:
+            - Total distance (30 days): {total_distance_30days:.1f} km
+            - Activities (30 days): {total_activities_30days}
+            - Average pace: {avg_pace_min_per_km:.2f} min/km
+            - Average heart rate: {avg_heart_rate:.0f} bpm
+            - Training load: {training_load:.0f}
+            - Weekly average: {weekly_avg_distance:.1f} km/week
+            
+            Current Activity:
+            - Distance: {current_distance_km:.1f} km
+            - Heart rate: {current_heart_rate:.0f} bpm
+            - Pace: {current_estimated_pace:.2f} min/km
+            
+            Provide 4-6 encouraging and specific recommendations:
+            1. Optimal race distance for next 4-6 weeks (based on current weekly volume)
+            2. Training focus areas for improvement
+            3. Realistic race time predictions (use current average pace {avg_pace_min_per_km:.2f} min/km as baseline - races are only 2-5% faster than training pace)
+            4. Recovery and injury prevention advice
+            5. Long-term goals based on progression
+            6. Next training phase recommendations
+            
+            IMPORTANT: For race time predictions, be conservative and realistic. Current average pace is {avg_pace_min_per_km:.2f} min/km.
+            - 5K prediction should be around {predicted_5k_minutes:.0f} minutes
+            - 10K prediction should be around {predicted_10k_minutes:.0f} minutes
+            
+            Keep each recommendation to 1-2 sentences, actionable, and motivating.
+            Use emojis strategically for visual appeal.
+            Be enthusiastic and supportive while staying data-driven and realistic.
+            """
+
+_BULK_ATHLETE_TEMPLATE = """
+=== ATHLETE {position} ===
+Training Profile:
+- Total distance (30 days): {total_distance_30days:.1f} km
+- Activities (30 days): {total_activities_30days}
+- Average pace: {avg_pace_min_per_km:.2f} min/km
+- Average heart rate: {avg_heart_rate:.0f} bpm
+- Training load: {training_load:.0f}
+- Weekly average: {weekly_avg_distance:.1f} km/week
+Current Activity:
+- Distance: {current_distance_km:.1f} km
+- Heart rate: {current_heart_rate:.0f} bpm
+- Pace: {current_estimated_pace:.2f} min/km
+Race time guide: 5K around {predicted_5k_minutes:.0f} minutes, 10K around {predicted_10k_minutes:.0f} minutes
+"""
+
+class AsyncLeakyBucket:
+    """
+    Token bucket that delays Gemini calls before the RPM quota is exceeded
+    """
+    
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    async def __aenter__(self):
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return self
+                wait = (1 - self.tokens) / self.rate
+            # Back off until the next token is due instead of waiting for a 429
+            await asyncio.sleep(wait)
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+_LIMITER = AsyncLeakyBucket(rate=int(os.environ.get('GEMINI_RPM_LIMIT', 15)) / 60)
+_SEMAPHORES = weakref.WeakKeyDictionary()
+
+def _get_semaphore() -> asyncio.Semaphore:
+    """Return the Gemini concurrency semaphore for the running event loop"""
+    loop = asyncio.get_running_loop()
+    semaphore = _SEMAPHORES.get(loop)
+    if semaphore is None:
+        semaphore = _SEMAPHORES[loop] = asyncio.Semaphore(_MAX_CONCURRENCY)
+    return semaphore
+
 class AIRaceAdvisor:
     """
     AI-powered race recommendation system using Google Gemini API
@@ -24,154 +242,378 @@ class AIRaceAdvisor:
     
     def __init__(self):
         self.api_key = os.environ.get('GEMINI_API_KEY')
-        if self.api_key:
-            self.client = genai.Client(api_key=self.api_key)
-        else:
+        if not self.api_key:
             logger.warning("GEMINI_API_KEY not found, AI recommendations will use fallback logic")
-            self.client = None
         
-        # Cache for AI recommendations to ensure consistency
-        self._recommendation_cache = {}
-        self._cache_duration = timedelta(hours=6)  # Cache for 6 hours
+        # Gemini client is created on first use, keeping SDK setup off the import path
+        self._client = None
+        
+        # Cache for AI recommendations to ensure consistency (24 hours, bounded)
+        self._recommendation_cache = TTLCache(maxsize=4096, ttl=24 * 3600)
+        self._cache_lock = threading.RLock()
+        
+        # Optional Redis store shared by all workers, behind the in-process cache
+        self._redis = None
+        self._redis_ttl = 24 * 3600
+    
+    @property
+    def client(self):
+        """Gemini client, or None when no API key or SDK is available"""
+        if self._client is None and self.api_key and genai is not None:
+            self._client = genai.Client(api_key=self.api_key)
+        return self._client
     
     def clear_cache(self):
         """Clear the recommendation cache to force fresh calculations"""
-        self._recommendation_cache.clear()
+        with self._cache_lock:
+            self._recommendation_cache.clear()
         logger.info("AI recommendation cache cleared")
     
-    def _create_data_fingerprint(self, athlete_data: Dict, current_activity: Dict) -> str:
-        """Create a hash fingerprint of the training data for cache key"""
+    def _create_data_fingerprint(self, athlete_data: Dict, current_activity: Dict) -> Tuple:
+        """Create a coarse profile-bucket fingerprint of the training data for cache key"""
         try:
-            # Create a simplified representation focusing on key metrics
-            cache_data = {
-                'total_distance': athlete_data.get('metrics', {}).get('total_distance', 0),
-                'total_activities': athlete_data.get('metrics', {}).get('total_activities', 0),
-                'avg_pace': athlete_data.get('metrics', {}).get('avg_pace', 0),
-                'avg_heart_rate': athlete_data.get('metrics', {}).get('avg_heart_rate', 0),
-                'current_distance': current_activity.get('distance', 0),
-                'current_pace': current_activity.get('pace', 0)
-            }
-            
-            # Create hash of the data
-            data_string = json.dumps(cache_data, sort_keys=True)
-            return hashlib.md5(data_string.encode()).hexdigest()
+            metrics = athlete_data.get('metrics', {})
+            return (
+                _bucket(metrics.get('total_distance', 0), _DISTANCE_BIN_KM),
+                metrics.get('total_activities', 0),
+                _bucket(metrics.get('avg_pace', 0), _PACE_BIN_MIN_KM),
+                _bucket(metrics.get('avg_heart_rate', 0), _HEART_RATE_BIN_BPM),
+                _bucket(current_activity.get('distance', 0), _DISTANCE_BIN_KM),
+                _bucket(current_activity.get('pace', 0), _PACE_BIN_MIN_KM)
+            )
         except Exception:
             # If fingerprinting fails, return current timestamp to avoid cache hits
-            return str(datetime.now().timestamp())
-
-    def generate_race_recommendations(self, athlete_data: Dict, current_activity: Dict) -> List[str]:
+            return (datetime.now().timestamp(),)
+    
+    def get_recommendation_etag(self, athlete_data: Dict, current_activity: Dict) -> str:
+        """Return an HTTP ETag that changes whenever the recommendation inputs change"""
+        metrics = athlete_data.get('metrics', {})
+        key = (
+            metrics.get('total_distance', 0),
+            metrics.get('total_activities', 0),
+            metrics.get('avg_pace', 0),
+            metrics.get('avg_heart_rate', 0),
+            metrics.get('training_load', 0),
+            current_activity.get('distance', 0),
+            current_activity.get('heart_rate', 0),
+            current_activity.get('pace', 0),
+            bool(self.api_key)
+        )
+        # Numeric tuple hashes are not randomized, so the tag is stable across workers
+        return format(hash(key) & 0xFFFFFFFFFFFFFFFF, 'x')
+    
+    def generate_race_recommendations(self, athlete_data: Dict, current_activity: Dict,
+                                      force_ai: bool = False) -> List[str]:
         """
         Generate AI-powered race recommendations based on athlete data and current activity
         
         Args:
             athlete_data: Dictionary containing athlete metrics and performance data
             current_activity: Dictionary containing current activity data (distance, HR, pace)
+            force_ai: Use Gemini even when the profile is clear-cut for the rule-based advice
             
         Returns:
             List of recommendation strings for tooltip display
         """
-        try:
-            # Create cache key based on data fingerprint
-            data_fingerprint = self._create_data_fingerprint(athlete_data, current_activity)
-            cache_key = f"recommendations_{data_fingerprint}"
+        return self.generate_race_recommendations_bulk([(athlete_data, current_activity)], force_ai)[0]
+    
+    def generate_race_recommendations_bulk(self, requests: List[Tuple[Dict, Dict]],
+                                           force_ai: bool = False) -> List[List[str]]:
+        """
+        Generate race recommendations for several athletes with one Gemini call per batch
+        
+        Args:
+            requests: List of (athlete_data, current_activity) pairs
+            force_ai: Use Gemini even when a profile is clear-cut for the rule-based advice
             
-            # Check cache first
-            if cache_key in self._recommendation_cache:
-                cached_entry = self._recommendation_cache[cache_key]
-                cache_time = cached_entry['timestamp']
+        Returns:
+            List of recommendation lists, in the same order as requests
+        """
+        results: List[Optional[List[str]]] = [None] * len(requests)
+        pending = []
+        
+        for index, (athlete_data, current_activity) in enumerate(requests):
+            try:
+                # Create cache key based on data fingerprint
+                cache_key = self._create_data_fingerprint(athlete_data, current_activity)
                 
-                # Check if cache is still valid
-                if datetime.now() - cache_time < self._cache_duration:
+                # Check cache first
+                cached = self._get_cached_recommendations(cache_key)
+                if cached is not None:
                     logger.info("Returning cached AI recommendations")
-                    return cached_entry['recommendations']
-                else:
-                    # Cache expired, remove entry
-                    del self._recommendation_cache[cache_key]
-            
-            logger.info(f"Generating new AI recommendations for athlete data")
+                    results[index] = cached
+                    continue
+                
+                if not self._use_ai(athlete_data, current_activity, force_ai):
+                    # Rule-based recommendations are cheap and exact per athlete, so skip the bucketed cache
+                    results[index] = self._generate_fallback_recommendations(athlete_data, current_activity)
+                    continue
+                
+                pending.append((index, cache_key))
+            except Exception as e:
+                logger.error(f"Error generating race recommendations: {str(e)}")
+                results[index] = self._generate_fallback_recommendations(athlete_data, current_activity)
+        
+        if pending:
+            logger.info(f"Generating new AI recommendations for {len(pending)} athletes")
+        
+        for start in range(0, len(pending), _BULK_SIZE):
+            batch = pending[start:start + _BULK_SIZE]
+            batch_requests = [requests[index] for index, _ in batch]
             
-            if self.client:
-                # Try AI-powered recommendations first
-                recommendations = self._generate_ai_recommendations(athlete_data, current_activity)
-                if recommendations:
-                    # Cache the successful AI recommendations
-                    self._recommendation_cache[cache_key] = {
-                        'recommendations': recommendations,
-                        'timestamp': datetime.now()
-                    }
-                    return recommendations
+            # One prompt for the whole batch
+            sections = self._generate_ai_recommendations_bulk(batch_requests)
             
-            # Fallback to rule-based recommendations
-            fallback_recommendations = self._generate_fallback_recommendations(athlete_data, current_activity)
+            for position, (index, cache_key) in enumerate(batch, start=1):
+                athlete_data, current_activity = requests[index]
+                recommendations = sections.get(position, [])
+                
+                if len(recommendations) < 3:
+                    # Degraded batch section - re-run this athlete on its own
+                    recommendations = self._generate_ai_recommendations(athlete_data, current_activity)
+                
+                if recommendations is None:
+                    # Rule-based advice depends on inputs the bucketed key leaves out, so it is not cached
+                    results[index] = self._generate_fallback_recommendations(athlete_data, current_activity)
+                    continue
+                
+                self._cache_recommendations(cache_key, recommendations)
+                results[index] = recommendations
+        
+        return results
+    
+    async def generate_race_recommendations_async(self, requests: List[Tuple[Dict, Dict]],
+                                                  force_ai: bool = False) -> List[List[str]]:
+        """
+        Generate race recommendations for several athletes with concurrent, rate-limited Gemini calls
+        
+        Args:
+            requests: List of (athlete_data, current_activity) pairs
+            force_ai: Use Gemini even when a profile is clear-cut for the rule-based advice
             
-            # Cache fallback recommendations with shorter duration
-            self._recommendation_cache[cache_key] = {
-                'recommendations': fallback_recommendations,
-                'timestamp': datetime.now()
-            }
+        Returns:
+            List of recommendation lists, in the same order as requests
+        """
+        async def recommend(athlete_data: Dict, current_activity: Dict) -> List[str]:
+            try:
+                cache_key = self._create_data_fingerprint(athlete_data, current_activity)
+                
+                cached = self._get_cached_recommendations(cache_key)
+                if cached is not None:
+                    logger.info("Returning cached AI recommendations")
+                    return cached
+                
+                if not self._use_ai(athlete_data, current_activity, force_ai):
+                    return self._generate_fallback_recommendations(athlete_data, current_activity)
+                
+                recommendations = await self._agenerate_ai_recommendations(athlete_data, current_activity)
+                if recommendations is None:
+                    return self._generate_fallback_recommendations(athlete_data, current_activity)
+                
+                self._cache_recommendations(cache_key, recommendations)
+                return recommendations
+                
+            except Exception as e:
+                logger.error(f"Error generating race recommendations: {str(e)}")
+                return self._generate_fallback_recommendations(athlete_data, current_activity)
+        
+        return list(await asyncio.gather(*(recommend(athlete_data, current_activity)
+                                           for athlete_data, current_activity in requests)))
+    
+    def generate_race_recommendations_concurrent(self, requests: List[Tuple[Dict, Dict]],
+                                                 force_ai: bool = False) -> List[List[str]]:
+        """Synchronous bridge to generate_race_recommendations_async for non-async callers"""
+        return asyncio.run(self.generate_race_recommendations_async(requests, force_ai))
+    
+    def stream_race_recommendations(self, athlete_data: Dict, current_activity: Dict,
+                                    force_ai: bool = False) -> Iterator[str]:
+        """
+        Yield race recommendations one at a time as Gemini streams its response
+        
+        Args:
+            athlete_data: Dictionary containing athlete metrics and performance data
+            current_activity: Dictionary containing current activity data (distance, HR, pace)
+            force_ai: Use Gemini even when the profile is clear-cut for the rule-based advice
             
-            return fallback_recommendations
+        Yields:
+            Recommendation strings, at most 6
+        """
+        cache_key = self._create_data_fingerprint(athlete_data, current_activity)
+        cached = self._get_cached_recommendations(cache_key)
+        if cached is not None:
+            yield from cached
+            return
+        
+        if not self._use_ai(athlete_data, current_activity, force_ai):
+            yield from self._generate_fallback_recommendations(athlete_data, current_activity)
+            return
+        
+        recommendations = []
+        
+        def add(line: str) -> List[str]:
+            """Parse one line; return the recommendations that are ready to be yielded"""
+            match = _BULLET_RE.match(line)
+            if not match or len(recommendations) >= 6:
+                return []
+            recommendations.append(match.group(1))
+            # Hold back the first 3 until the AI answer is known to be usable
+            if len(recommendations) == 3:
+                return list(recommendations)
+            return recommendations[3:][-1:]
+        
+        buffer = ''
+        failed = False
+        try:
+            prompt = self._build_prompt(self._build_training_profile(athlete_data, current_activity))
+            stream = self.client.models.generate_content_stream(
+                model="gemini-2.0-flash",
+                contents=prompt
+            )
             
+            for chunk in stream:
+                buffer += chunk.text or ''
+                # Emit each bullet as soon as its line is complete
+                *lines, buffer = buffer.split('\n')
+                for line in lines:
+                    yield from add(line)
+                
         except Exception as e:
-            logger.error(f"Error generating race recommendations: {str(e)}")
-            return self._generate_fallback_recommendations(athlete_data, current_activity)
+            logger.error(f"Error streaming Gemini AI recommendations: {str(e)}")
+            failed = True
+        
+        yield from add(buffer)
+        
+        if len(recommendations) < 3:
+            # Nothing has been yielded yet, so the rule-based advice stands in for the whole answer
+            yield from self._generate_fallback_recommendations(athlete_data, current_activity)
+        elif not failed:
+            self._cache_recommendations(cache_key, recommendations)
     
-    def _generate_ai_recommendations(self, athlete_data: Dict, current_activity: Dict) -> List[str]:
-        """Generate recommendations using Gemini AI"""
+    def _use_ai(self, athlete_data: Dict, current_activity: Dict, force_ai: bool) -> bool:
+        """Whether a cache miss should go to Gemini rather than the rule-based fallback"""
+        if not self.client:
+            return False
+        return force_ai or self._needs_ai(self._build_training_profile(athlete_data, current_activity))
+    
+    def _needs_ai(self, training_profile: Dict) -> bool:
+        """Triage: only profiles near a race-tier boundary get advice the rules cannot give"""
+        weekly_distance = training_profile['weekly_avg_distance']
+        avg_pace = training_profile['avg_pace_min_per_km']
+        
+        near_distance_tier = np.any(np.abs(weekly_distance - _RACE_DISTANCE_BINS)
+                                    <= _TRIAGE_DISTANCE_MARGIN * _RACE_DISTANCE_BINS)
+        near_pace_tier = np.any(np.abs(avg_pace + _RACE_PACE_BINS)
+                                <= _TRIAGE_PACE_MARGIN * -_RACE_PACE_BINS)
+        return bool(near_distance_tier or near_pace_tier)
+    
+    def _get_redis(self):
+        """Connect to Redis lazily; returns None when Redis is not configured"""
+        if self._redis is None and redis is not None and Config.REDIS_URL:
+            self._redis = redis.Redis.from_url(Config.REDIS_URL, socket_timeout=0.5)
+        return self._redis
+    
+    def _redis_key(self, cache_key: Tuple) -> str:
+        """Redis string key for a recommendation cache key"""
+        return "ai:recs:" + "|".join(map(str, cache_key))
+    
+    def _get_cached_recommendations(self, cache_key: Tuple) -> Optional[List[str]]:
+        """Return cached recommendations from memory, then Redis, if present and not expired"""
+        with self._cache_lock:
+            recommendations = self._recommendation_cache.get(cache_key)
+        if recommendations is not None:
+            return recommendations
+        
+        redis_client = self._get_redis()
+        if redis_client is not None:
+            try:
+                payload = redis_client.get(self._redis_key(cache_key))
+                if payload:
+                    recommendations = orjson.loads(payload)
+                    with self._cache_lock:
+                        self._recommendation_cache[cache_key] = recommendations
+                    return recommendations
+            except Exception as e:
+                logger.warning(f"Failed to read cached AI recommendations: {str(e)}")
+        return None
+    
+    def _cache_recommendations(self, cache_key: Tuple, recommendations: List[str]):
+        """Store recommendations in memory and in Redis when configured"""
+        with self._cache_lock:
+            self._recommendation_cache[cache_key] = recommendations
+        
+        redis_client = self._get_redis()
+        if redis_client is not None:
+            try:
+                redis_client.setex(self._redis_key(cache_key), self._redis_ttl, orjson.dumps(recommendations))
+            except Exception as e:
+                logger.warning(f"Failed to cache AI recommendations: {str(e)}")
+    
+    def _build_training_profile(self, athlete_data: Dict, current_activity: Dict) -> Dict:
+        """Extract the flat training metrics used to fill the Gemini prompt templates"""
+        metrics = athlete_data.get('metrics', {})
+        avg_pace = metrics.get('avg_pace', 0)
+        
+        return {
+            'total_distance_30days': metrics.get('total_distance', 0),
+            'total_activities_30days': metrics.get('total_activities', 0),
+            'avg_pace_min_per_km': avg_pace,
+            'avg_heart_rate': metrics.get('avg_heart_rate', 0),
+            'training_load': metrics.get('training_load', 0),
+            'current_distance_km': current_activity.get('distance', 0),
+            'current_heart_rate': current_activity.get('heart_rate', 0),
+            'current_estimated_pace': current_activity.get('pace', metrics.get('avg_pace', 7.0)),
+            'weekly_avg_distance': metrics.get('total_distance', 0) / 4.3,  # Convert monthly to weekly
+            'predicted_5k_minutes': avg_pace * 0.97 * 5,
+            'predicted_10k_minutes': avg_pace * 0.98 * 10
+        }
+    
+    def _build_prompt(self, training_profile: Dict) -> str:
+        """Build the single-athlete Gemini prompt"""
+        return _PROMPT_TEMPLATE.format_map(training_profile)
+    
+    def _build_bulk_prompt(self, profiles: List[Dict]) -> str:
+        """Build one Gemini prompt with a shared preamble and a numbered block per athlete"""
+        blocks = [_BULK_PROMPT_PREAMBLE]
+        for position, profile in enumerate(profiles, start=1):
+            blocks.append(_BULK_ATHLETE_TEMPLATE.format(position=position, **profile))
+        return ''.join(blocks)
+    
+    def _generate_ai_recommendations_bulk(self, requests: List[Tuple[Dict, Dict]]) -> Dict[int, List[str]]:
+        """Generate recommendations for a batch of athletes with a single Gemini call"""
         try:
-            # Prepare training context
-            metrics = athlete_data.get('metrics', {})
-            activities = athlete_data.get('performance_summary', {}).get('activities', [])
+            profiles = [self._build_training_profile(athlete_data, current_activity)
+                        for athlete_data, current_activity in requests]
+            prompt = self._build_bulk_prompt(profiles)
             
-            # Create comprehensive training profile
-            training_profile = {
-                'total_distance_30days': metrics.get('total_distance', 0),
-                'total_activities_30days': metrics.get('total_activities', 0),
-                'avg_pace_min_per_km': metrics.get('avg_pace', 0),
-                'avg_heart_rate': metrics.get('avg_heart_rate', 0),
-                'training_load': metrics.get('training_load', 0),
-                'current_activity': {
-                    'distance_km': current_activity.get('distance', 0),
-                    'heart_rate': current_activity.get('heart_rate', 0),
-                    'estimated_pace': current_activity.get('pace', metrics.get('avg_pace', 7.0))
-                },
-                'recent_activities_count': len(activities),
-                'weekly_avg_distance': metrics.get('total_distance', 0) / 4.3  # Convert monthly to weekly
-            }
+            logger.info(f"Sending batched prompt for {len(profiles)} athletes to Gemini API")
             
-            # Create AI prompt for race recommendations
-            prompt = f"""
-            As an enthusiastic marathon coach, analyze this runner's data and provide encouraging, personalized race recommendations.
+            response = self.client.models.generate_content(
+                model="gemini-2.0-flash",
+                contents=prompt
+            )
             
-            Training Profile:
-            - Total distance (30 days): {training_profile['total_distance_30days']:.1f} km
-            - Activities (30 days): {training_profile['total_activities_30days']}
-            - Average pace: {training_profile['avg_pace_min_per_km']:.2f} min/km
-            - Average heart rate: {training_profile['avg_heart_rate']:.0f} bpm
-            - Training load: {training_profile['training_load']:.0f}
-            - Weekly average: {training_profile['weekly_avg_distance']:.1f} km/week
+            if not response or not response.text:
+                return {}
             
-            Current Activity:
-            - Distance: {training_profile['current_activity']['distance_km']:.1f} km
-            - Heart rate: {training_profile['current_activity']['heart_rate']:.0f} bpm
-            - Pace: {training_profile['current_activity']['estimated_pace']:.2f} min/km
+            # re.split yields [preamble, k1, body1, k2, body2, ...]
+            parts = _ATHLETE_SECTION_RE.split(response.text)
+            sections = {}
+            for number, body in zip(parts[1::2], parts[2::2]):
+                sections[int(number)] = _BULLET_RE.findall(body)[:6]
+            return sections
             
-            Provide 4-6 encouraging and specific recommendations:
-            1. Optimal race distance for next 4-6 weeks (based on current weekly volume)
-            2. Training focus areas for improvement
-            3. Realistic race time predictions (use current average pace {training_profile['avg_pace_min_per_km']:.2f} min/km as baseline - races are only 2-5% faster than training pace)
-            4. Recovery and injury prevention advice
-            5. Long-term goals based on progression
-            6. Next training phase recommendations
-            
-            IMPORTANT: For race time predictions, be conservative and realistic. Current average pace is {training_profile['avg_pace_min_per_km']:.2f} min/km.
-            - 5K prediction should be around {training_profile['avg_pace_min_per_km'] * 0.97 * 5:.0f} minutes
-            - 10K prediction should be around {training_profile['avg_pace_min_per_km'] * 0.98 * 10:.0f} minutes
+        except Exception as e:
+            logger.error(f"Error with batched Gemini AI recommendations: {str(e)}")
+            return {}
+    
+    def _generate_ai_recommendations(self, athlete_data: Dict, current_activity: Dict) -> Optional[List[str]]:
+        """Generate recommendations using Gemini AI; None when Gemini fails or gives fewer than 3"""
+        try:
+            # Create comprehensive training profile
+            training_profile = self._build_training_profile(athlete_data, current_activity)
             
-            Keep each recommendation to 1-2 sentences, actionable, and motivating.
-            Use emojis strategically for visual appeal.
-            Be enthusiastic and supportive while staying data-driven and realistic.
-            """
+            # Create AI prompt for race recommendations
+            prompt = self._build_prompt(training_profile)
             
             # Log the prompt being sent to Gemini
             logger.info(f"Sending prompt to Gemini API: {prompt[:200]}...")
@@ -185,116 +627,105 @@ class AIRaceAdvisor:
             logger.info(f"Gemini API Response: {response.text if response else 'No response'}")
             
             # Parse AI response into list of recommendations
-            recommendations = []
-            if response and response.text:
-                lines = response.text.strip().split('\n')
-                for line in lines:
-                    line = line.strip()
-                    if line and not line.startswith('#'):
-                        # Clean up numbered list formatting
-                        if line[0].isdigit() and '.' in line[:3]:
-                            line = line[line.find('.') + 1:].strip()
-                        if line:
-                            recommendations.append(line)
+            recommendations = _BULLET_RE.findall(response.text) if response and response.text else []
             
             # Ensure we have at least 3 recommendations
             if len(recommendations) < 3:
-                return self._generate_fallback_recommendations(athlete_data, current_activity)
+                return None
             
             return recommendations[:6]  # Limit to 6 recommendations for tooltip
             
         except Exception as e:
             logger.error(f"Error with Gemini AI recommendations: {str(e)}")
-            return self._generate_fallback_recommendations(athlete_data, current_activity)
+            return None
+    
+    async def _agenerate_ai_recommendations(self, athlete_data: Dict,
+                                            current_activity: Dict) -> Optional[List[str]]:
+        """Async Gemini recommendations behind the concurrency and rate limits; None on failure"""
+        try:
+            training_profile = self._build_training_profile(athlete_data, current_activity)
+            prompt = self._build_prompt(training_profile)
+            
+            async with _get_semaphore(), _LIMITER:
+                response = await self.client.aio.models.generate_content(
+                    model="gemini-2.0-flash",
+                    contents=prompt
+                )
+            
+            recommendations = _BULLET_RE.findall(response.text) if response and response.text else []
+            
+            # Ensure we have at least 3 recommendations
+            if len(recommendations) < 3:
+                return None
+            
+            return recommendations[:6]
+            
+        except Exception as e:
+            logger.error(f"Error with async Gemini AI recommendations: {str(e)}")
+            return None
     
     def _generate_fallback_recommendations(self, athlete_data: Dict, current_activity: Dict) -> List[str]:
         """Generate recommendations using rule-based logic when AI is unavailable"""
         metrics = athlete_data.get('metrics', {})
-        recommendations = []
         
         # Calculate readiness metrics
         weekly_distance = metrics.get('total_distance', 0) / 4.3
         avg_pace = metrics.get('avg_pace', 7.0)
         training_load = metrics.get('training_load', 0)
-        current_distance = current_activity.get('distance', 0)
         current_hr = current_activity.get('heart_rate', metrics.get('avg_heart_rate', 150))
         
-        # Race distance recommendations
-        if weekly_distance >= 50 and avg_pace <= 5.5:
-            recommendations.append("🏆 Marathon ready! Consider 42.2K race within 8-12 weeks")
-        elif weekly_distance >= 35 and avg_pace <= 6.0:
-            recommendations.append("🏃‍♂️ Half Marathon optimal (21.1K) - excellent fitness base")
-        elif weekly_distance >= 20 and avg_pace <= 7.0:
-            recommendations.append("🎯 10K race ready - perfect distance for current fitness")
-        else:
-            recommendations.append("⚡ 5K focus recommended - build weekly volume first")
-        
         # Training intensity analysis
         max_hr_estimated = 220 - 30  # Assume 30 years old
         hr_intensity = (current_hr / max_hr_estimated) * 100
         
-        if hr_intensity < 70:
-            recommendations.append("💚 Excellent aerobic efficiency - maintain this zone")
-        elif hr_intensity < 85:
-            recommendations.append("🟡 Moderate intensity - good for tempo training")
-        else:
-            recommendations.append("🔴 High intensity detected - ensure adequate recovery")
-        
-        # Performance predictions
-        predicted_5k = self._predict_race_time(5, avg_pace)
-        predicted_10k = self._predict_race_time(10, avg_pace)
-        
-        recommendations.append(f"🎯 Predicted times: 5K {predicted_5k}, 10K {predicted_10k}")
-        
-        # Training load assessment
-        if training_load > 800:
-            recommendations.append("📈 High training load - consider recovery week")
-        elif training_load > 400:
-            recommendations.append("🔄 Solid training volume - maintain consistency")
-        else:
-            recommendations.append("📊 Build training volume gradually for better fitness")
-        
-        return recommendations
+        return _fallback_bulk(np.array([weekly_distance]), np.array([avg_pace]),
+                              np.array([hr_intensity]), np.array([training_load]))[0]
     
     def _predict_race_time(self, distance_km: float, avg_pace_min_km: float) -> str:
         """Predict race time based on training pace and distance"""
-        # Conservative race pace prediction: races are typically 2-5% faster than training pace
-        # But never more optimistic than current best pace
-        if distance_km <= 5:
-            race_factor = 0.97  # 3% faster for 5K
-        elif distance_km <= 10:
-            race_factor = 0.98  # 2% faster for 10K
-        elif distance_km <= 21:
-            race_factor = 0.99  # 1% faster for half marathon
-        else:
-            race_factor = 1.02  # 2% slower for marathon (endurance challenge)
-        
-        race_pace = avg_pace_min_km * race_factor
-        total_minutes = race_pace * distance_km
-        
-        hours = int(total_minutes // 60)
-        minutes = int(total_minutes % 60)
-        seconds = int((total_minutes % 1) * 60)
-        
-        if hours > 0:
-            return f"{hours}:{minutes:02d}:{seconds:02d}"
-        else:
-            return f"{minutes}:{seconds:02d}"
+        return _format_race_time(distance_km, avg_pace_min_km)
 
-# Global instance
-ai_race_advisor = AIRaceAdvisor()
+@lru_cache(maxsize=1)
+def get_advisor() -> AIRaceAdvisor:
+    """Return the shared advisor, constructing it on first use"""
+    return AIRaceAdvisor()
 
-def get_race_recommendations(athlete_data: Dict, current_activity: Dict) -> List[str]:
+def get_race_recommendations(athlete_data: Dict, current_activity: Dict, force_ai: bool = False) -> List[str]:
     """
     Global function to get AI race recommendations
     
     Args:
-        athlete_data: Complete athlete data including metrics and activities
+        athlete_data: Athlete data including metrics
         current_activity: Current activity data (distance, heart_rate, pace)
+        force_ai: Use Gemini even when the profile is clear-cut for the rule-based advice
         
     Returns:
         List of recommendation strings
     """
-    # Clear cache to ensure fresh calculations with updated distance filtering
-    ai_race_advisor.clear_cache()
-    return ai_race_advisor.generate_race_recommendations(athlete_data, current_activity)
\ No newline at end of file
+    return get_advisor().generate_race_recommendations(athlete_data, current_activity, force_ai)
+
+def get_race_recommendations_etag(athlete_data: Dict, current_activity: Dict) -> str:
+    """
+    Global function to get the HTTP ETag for AI race recommendations
+    
+    Args:
+        athlete_data: Athlete data including metrics
+        current_activity: Current activity data (distance, heart_rate, pace)
+        
+    Returns:
+        ETag string, unchanged while the recommendation inputs are unchanged
+    """
+    return get_advisor().get_recommendation_etag(athlete_data, current_activity)
+
+def stream_race_recommendations(athlete_data: Dict, current_activity: Dict) -> Iterator[str]:
+    """
+    Global function to stream AI race recommendations
+    
+    Args:
+        athlete_data: Athlete data including metrics
+        current_activity: Current activity data (distance, heart_rate, pace)
+        
+    Returns:
+        Iterator of recommendation strings
+    """
+    return get_advisor().stream_race_recommendations(athlete_data, current_activity)
\ No newline at end of file
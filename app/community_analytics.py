@@ -4,15 +4,75 @@ Provides sophisticated community-level metrics and insights
 """
 
 import logging
-from datetime import datetime, timedelta
+import threading
+from datetime import date, datetime, timedelta
+from functools import lru_cache
 from typing import Dict, List, Tuple
-from sqlalchemy import func, and_
+from cachetools import TTLCache
+from sqlalchemy import Date, Integer, cast, func, select
+from sqlalchemy.engine import Row
 from app.models import Activity, ReplitAthlete, db
 from app.training_load_calculator import TrainingLoadCalculator
 import numpy as np
+import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+# Recently computed trends keyed by (today, days, latest activity start date)
+_trends_cache = TTLCache(maxsize=32, ttl=60)
+_trends_cache_lock = threading.Lock()
+
+# Base intensity for different sport types, used for duration based TSS
+SPORT_INTENSITIES = {
+    'Run': 0.75,
+    'Ride': 0.70,
+    'Swim': 0.80,
+    'Tennis': 0.65,
+    'Strength': 0.60,
+    'Other': 0.50
+}
+
+# Integer codes for sport types; a missing sport type counts as 'Other' and
+# unlisted sport types share the last code
+SPORT_CODES = {sport_type: code for code, sport_type in enumerate(SPORT_INTENSITIES)}
+UNKNOWN_SPORT_CODE = len(SPORT_CODES)
+
+# Base intensity by sport code, 0.60 for unlisted sport types
+SPORT_INTENSITY_BY_CODE = np.array(list(SPORT_INTENSITIES.values()) + [0.60])
+
+# Activity columns read by the community metrics; avoids hydrating full ORM objects
+COMMUNITY_ACTIVITY_COLUMNS = (
+    Activity.id,
+    Activity.athlete_id,
+    Activity.moving_time,
+    Activity.elapsed_time,
+    Activity.average_heartrate,
+    Activity.max_heartrate,
+    Activity.distance,
+    Activity.average_speed,
+    Activity.sport_type,
+)
+
+# Projected columns converted to float arrays (None becomes 0)
+NUMERIC_ACTIVITY_COLUMNS = ('moving_time', 'elapsed_time', 'average_heartrate', 'max_heartrate',
+                            'distance', 'average_speed')
+
+# Workout types in classification priority; activities matching none are 'Other Activity'
+WORKOUT_TYPES = ('Long Run', 'Short Run', 'Base Run', 'Cross Training', 'Long Ride', 'Bike Training',
+                 'Other Activity')
+
+# Constant part of the empty trends dataset; the zero series is added per call
+EMPTY_TRENDS_DATASET = {
+    'label': 'Community TSS',
+    'borderColor': 'rgb(34, 197, 94)',
+    'backgroundColor': 'rgba(34, 197, 94, 0.1)'
+}
+
+@lru_cache(maxsize=8)
+def _trend_labels(end_date: date, days: int) -> Tuple[str, ...]:
+    """Chart labels for the days ending on end_date"""
+    return tuple((end_date - timedelta(days=days-1-i)).strftime('%m/%d') for i in range(days))
+
 class CommunityAnalytics:
     """Advanced analytics for community-level training insights"""
     
@@ -29,52 +89,64 @@ class CommunityAnalytics:
             start_date = today - timedelta(days=days-1)  # Include today as the last day
             cutoff_datetime = datetime.combine(start_date, datetime.min.time())
             
-            # Get all active athletes with activities in the period
-            athletes_with_activities = db.session.query(ReplitAthlete).join(Activity).filter(
-                and_(
+            # Calendar day of each activity as an offset from the first day of the window, computed in SQL
+            if db.session.get_bind().dialect.name == 'sqlite':
+                day_offset = cast(
+                    func.julianday(func.date(Activity.start_date)) - func.julianday(start_date.isoformat()), Integer
+                ).label('day_offset')
+            else:
+                # Subtracting two dates gives whole days on PostgreSQL
+                day_offset = cast(cast(Activity.start_date, Date) - start_date, Integer).label('day_offset')
+            
+            # Get all activities of active athletes in the period with one query
+            activities = db.session.execute(
+                select(*COMMUNITY_ACTIVITY_COLUMNS, day_offset)
+                .join(ReplitAthlete, ReplitAthlete.id == Activity.athlete_id)
+                .where(
                     ReplitAthlete.is_active == True,
                     Activity.start_date >= cutoff_datetime
                 )
-            ).distinct().all()
+            ).all()
             
-            if not athletes_with_activities:
+            if not activities:
                 return self._get_empty_trends(days)
             
-            # Calculate daily community metrics - include today
-            daily_metrics = {}
-            date_range = [start_date + timedelta(days=i) for i in range(days)]
+            # Per-activity TSS and intensity computed over column arrays in one pass
+            columns = self._activity_columns(activities)
+            tss = self._calculate_activity_tss(columns)
+            intensity = self._calculate_intensity_scores(columns)
+            day_index = columns['day_offset'].astype(np.int32)
             
-            for date in date_range:
-                day_start = datetime.combine(date, datetime.min.time())
-                day_end = day_start + timedelta(days=1)
-                
-                daily_metrics[date.strftime('%Y-%m-%d')] = self._calculate_daily_community_metrics(
-                    day_start, day_end, athletes_with_activities
-                )
+            # Athletes with activities in the period
+            total_athletes = len(np.unique(columns['athlete_id']))
+            
+            # Calculate daily community metrics - include today
+            day_metrics = self._calculate_daily_community_metrics(columns, day_index, tss, intensity,
+                                                                  days, total_athletes)
+            daily_metrics = dict(zip(
+                ((start_date + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(days)), day_metrics
+            ))
+            day_labels = _trend_labels(today, days)
             
             # Filter out zero-activity days for better chart representation
-            filtered_data = []
-            for date in date_range:
-                date_str = date.strftime('%Y-%m-%d')
-                metrics = daily_metrics[date_str]
-                if metrics['active_athletes'] > 0 or metrics['avg_tss'] > 0:
-                    filtered_data.append({
-                        'label': date.strftime('%m/%d'),
-                        'tss': metrics['avg_tss'],
-                        'athletes': metrics['active_athletes'],
-                        'intensity': metrics['avg_intensity'],
-                        'consistency': metrics['consistency_score']
-                    })
+            filtered_data = [{
+                'label': label,
+                'tss': metrics['avg_tss'],
+                'athletes': metrics['active_athletes'],
+                'intensity': metrics['avg_intensity'],
+                'consistency': metrics['consistency_score']
+            } for label, metrics in zip(day_labels, day_metrics)
+                if metrics['active_athletes'] > 0 or metrics['avg_tss'] > 0]
             
             # If no active days found, show last 7 days anyway to avoid empty chart
             if not filtered_data:
                 filtered_data = [{
-                    'label': date.strftime('%m/%d'),
-                    'tss': daily_metrics[date.strftime('%Y-%m-%d')]['avg_tss'],
-                    'athletes': daily_metrics[date.strftime('%Y-%m-%d')]['active_athletes'],
-                    'intensity': daily_metrics[date.strftime('%Y-%m-%d')]['avg_intensity'],
-                    'consistency': daily_metrics[date.strftime('%Y-%m-%d')]['consistency_score']
-                } for date in date_range[-7:]]  # Show last 7 days as fallback
+                    'label': label,
+                    'tss': metrics['avg_tss'],
+                    'athletes': metrics['active_athletes'],
+                    'intensity': metrics['avg_intensity'],
+                    'consistency': metrics['consistency_score']
+                } for label, metrics in zip(day_labels[-7:], day_metrics[-7:])]  # Show last 7 days as fallback
             
             # Extract data for chart
             labels = [item['label'] for item in filtered_data]
@@ -115,183 +187,162 @@ class CommunityAnalytics:
                         'tension': 0.4
                     }
                 ],
-                'insights': self._generate_community_insights(daily_metrics, athletes_with_activities)
+                'insights': self._generate_community_insights(daily_metrics, total_athletes)
             }
             
         except Exception as e:
             logger.error(f"Error calculating enhanced community trends: {str(e)}")
             return self._get_empty_trends(days)
     
-    def _calculate_daily_community_metrics(self, day_start: datetime, day_end: datetime, athletes: List) -> Dict:
-        """Calculate comprehensive metrics for a single day"""
+    def _calculate_daily_community_metrics(self, columns: Dict[str, np.ndarray], day_index: np.ndarray, tss: np.ndarray,
+                                           intensity: np.ndarray, days: int, total_athletes: int) -> List[Dict]:
+        """Calculate comprehensive metrics for every day of the window in one pass"""
+        in_window = (day_index >= 0) & (day_index < days)
         
-        # Get all activities for the day
-        daily_activities = db.session.query(Activity).filter(
-            and_(
-                Activity.start_date >= day_start,
-                Activity.start_date < day_end,
-                Activity.athlete_id.in_([a.id for a in athletes])
-            )
-        ).all()
+        # Daily sums and counts of positive TSS and intensity values
+        positive_tss = in_window & (tss > 0)
+        tss_totals = np.bincount(day_index[positive_tss], weights=tss[positive_tss], minlength=days)
+        tss_counts = np.bincount(day_index[positive_tss], minlength=days)
+        positive_intensity = in_window & (intensity > 0)
+        intensity_totals = np.bincount(day_index[positive_intensity], weights=intensity[positive_intensity],
+                                       minlength=days)
+        intensity_counts = np.bincount(day_index[positive_intensity], minlength=days)
         
-        if not daily_activities:
-            return {
-                'avg_tss': 0,
-                'active_athletes': 0,
-                'avg_intensity': 0,
-                'consistency_score': 0,
-                'total_volume': 0,
-                'workout_distribution': {}
-            }
+        # Distinct athletes per day from unique (day, athlete) pairs
+        athlete_index = columns['athlete_id']
+        stride = int(athlete_index.max()) + 1
+        day_athlete_pairs = np.unique(day_index[in_window] * stride + athlete_index[in_window])
+        active_counts = np.bincount(day_athlete_pairs // stride, minlength=days)
         
-        # Calculate Training Stress Score (TSS) for each activity
-        tss_values = []
-        intensity_scores = []
-        active_athlete_ids = set()
-        workout_types = {}
+        # Track workout types per day from unique (day, workout type) pairs
+        type_codes = self._classify_workout_types(columns)
+        day_type_pairs, pair_counts = np.unique(day_index[in_window] * len(WORKOUT_TYPES) + type_codes[in_window],
+                                                return_counts=True)
+        workout_types = [{} for _ in range(days)]
+        for pair, count in zip(day_type_pairs.tolist(), pair_counts.tolist()):
+            day, type_code = divmod(pair, len(WORKOUT_TYPES))
+            workout_types[day][WORKOUT_TYPES[type_code]] = count
         
-        for activity in daily_activities:
-            active_athlete_ids.add(activity.athlete_id)
-            
-            # Calculate TSS using our training load calculator
-            tss = self._calculate_activity_tss(activity)
-            if tss > 0:
-                tss_values.append(tss)
-            
-            # Calculate intensity score (0-100 based on effort)
-            intensity = self._calculate_intensity_score(activity)
-            if intensity > 0:
-                intensity_scores.append(intensity)
+        # Daily means of the positive values, 0 for days without any, rounded in one pass
+        avg_tss = np.round(np.divide(tss_totals, tss_counts, out=np.zeros(days), where=tss_counts > 0), 1)
+        avg_intensity = np.round(np.divide(intensity_totals, intensity_counts, out=np.zeros(days),
+                                           where=intensity_counts > 0), 1)
+        
+        daily_metrics = []
+        for day_tss, active_count, day_intensity, day_volume, day_workouts in zip(
+                avg_tss.tolist(), active_counts.tolist(), avg_intensity.tolist(), tss_totals.tolist(), workout_types):
+            # Calculate consistency score (how many athletes trained vs total)
+            consistency_score = round((active_count / total_athletes) * 100, 1) if total_athletes > 0 else 0
             
-            # Track workout types
-            workout_type = self._classify_workout_type(activity)
-            workout_types[workout_type] = workout_types.get(workout_type, 0) + 1
+            daily_metrics.append({
+                'avg_tss': day_tss,
+                'active_athletes': active_count,
+                'avg_intensity': day_intensity,
+                'consistency_score': consistency_score,
+                'total_volume': day_volume,
+                'workout_distribution': day_workouts
+            })
         
-        # Calculate consistency score (how many athletes trained vs total)
-        total_athletes = len(athletes)
-        active_count = len(active_athlete_ids)
-        consistency_score = round((active_count / total_athletes) * 100, 1) if total_athletes > 0 else 0
+        return daily_metrics
+    
+    def _activity_columns(self, activities: List[Row]) -> Dict[str, np.ndarray]:
+        """Transpose activity rows into column arrays; missing numeric values become 0"""
+        frame = pd.DataFrame.from_records(activities, columns=list(activities[0]._fields), coerce_float=True)
+        columns = {name: frame[name].to_numpy() for name in frame.columns}
         
-        return {
-            'avg_tss': round(np.mean(tss_values), 1) if tss_values else 0,
-            'active_athletes': active_count,
-            'avg_intensity': round(np.mean(intensity_scores), 1) if intensity_scores else 0,
-            'consistency_score': consistency_score,
-            'total_volume': sum(tss_values),
-            'workout_distribution': workout_types
-        }
+        columns['athlete_id'] = columns['athlete_id'].astype(np.int64)
+        columns['sport_code'] = (frame['sport_type'].fillna('Other').map(SPORT_CODES)
+                                 .fillna(UNKNOWN_SPORT_CODE).to_numpy(dtype=np.int8))
+        for name in NUMERIC_ACTIVITY_COLUMNS:
+            columns[name] = frame[name].fillna(0).to_numpy(dtype=np.float64)
+        
+        # Duration falls back from moving time to elapsed time
+        columns['duration_hours'] = np.where(columns['moving_time'] != 0,
+                                             columns['moving_time'], columns['elapsed_time']) / 3600
+        return columns
     
-    def _calculate_activity_tss(self, activity: Activity) -> float:
-        """Calculate Training Stress Score for an activity"""
-        try:
-            duration_hours = (activity.moving_time or activity.elapsed_time or 0) / 3600
-            
-            if duration_hours <= 0:
-                return 0
-            
-            # Heart rate based TSS (preferred)
-            if activity.average_heartrate and activity.max_heartrate:
-                hr_intensity = activity.average_heartrate / activity.max_heartrate
-                return duration_hours * 100 * (hr_intensity ** 2)
-            
-            # Distance/pace based TSS for running
-            elif activity.distance and activity.average_speed:
-                pace_per_km = 1000 / (activity.average_speed * 60)  # min/km
-                
-                # Estimate intensity based on pace (assuming 5:00/km = threshold pace)
-                threshold_pace = 5.0  # minutes per km
-                intensity_factor = min(threshold_pace / pace_per_km, 1.2)
-                
-                return duration_hours * 100 * (intensity_factor ** 2)
-            
-            # Duration based TSS (fallback)
-            else:
-                # Base intensity for different sport types
-                sport_intensities = {
-                    'Run': 0.75,
-                    'Ride': 0.70,
-                    'Swim': 0.80,
-                    'Tennis': 0.65,
-                    'Strength': 0.60,
-                    'Other': 0.50
-                }
-                
-                sport_type = activity.sport_type or 'Other'
-                base_intensity = sport_intensities.get(sport_type, 0.60)
-                
-                return duration_hours * 100 * (base_intensity ** 2)
-                
-        except Exception as e:
-            logger.warning(f"Error calculating TSS for activity {activity.id}: {str(e)}")
-            return 0
+    def _calculate_activity_tss(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        """Calculate Training Stress Score for each activity"""
+        duration_hours = columns['duration_hours']
+        avg_hr = columns['average_heartrate']
+        max_hr = columns['max_heartrate']
+        speed = columns['average_speed']
+        
+        # Heart rate based TSS (preferred), then distance/pace based, then duration based
+        hr_mask = (avg_hr != 0) & (max_hr != 0)
+        pace_mask = ~hr_mask & (columns['distance'] != 0) & (speed != 0)
+        
+        # Duration based intensity (fallback) with a base intensity per sport type
+        intensity_factor = SPORT_INTENSITY_BY_CODE[columns['sport_code']]
+        
+        np.divide(avg_hr, max_hr, out=intensity_factor, where=hr_mask)
+        
+        # Estimate intensity based on pace (assuming 5:00/km = threshold pace)
+        pace_per_km = np.divide(1000, speed * 60, out=np.ones_like(speed), where=pace_mask)  # min/km
+        threshold_pace = 5.0  # minutes per km
+        intensity_factor = np.where(pace_mask, np.clip(threshold_pace / pace_per_km, 0, 1.2), intensity_factor)
+        
+        # One fused pass over all activities instead of per-branch gathers and scatters
+        tss = duration_hours * 100 * (intensity_factor ** 2)
+        tss[duration_hours <= 0] = 0
+        return tss
     
-    def _calculate_intensity_score(self, activity: Activity) -> float:
-        """Calculate intensity score (0-100) based on effort indicators"""
-        try:
-            intensity_indicators = []
-            
-            # Heart rate intensity
-            if activity.average_heartrate and activity.max_heartrate:
-                hr_percentage = (activity.average_heartrate / activity.max_heartrate) * 100
-                intensity_indicators.append(min(hr_percentage, 100))
-            
-            # Pace intensity (for running)
-            if activity.sport_type == 'Run' and activity.average_speed:
-                pace_per_km = 1000 / (activity.average_speed * 60)
-                
-                # Relative to estimated easy pace (assume 6:30/km as moderate)
-                easy_pace = 6.5
-                pace_intensity = max(0, min(100, (easy_pace / pace_per_km) * 60))
-                intensity_indicators.append(pace_intensity)
-            
-            # Duration intensity (longer = higher aerobic demand)
-            duration_hours = (activity.moving_time or activity.elapsed_time or 0) / 3600
-            duration_intensity = min(100, duration_hours * 25)  # 4 hours = 100%
-            intensity_indicators.append(duration_intensity)
-            
-            # Return average of available indicators
-            return round(np.mean(intensity_indicators), 1) if intensity_indicators else 50
-            
-        except Exception as e:
-            logger.warning(f"Error calculating intensity for activity {activity.id}: {str(e)}")
-            return 50
+    def _calculate_intensity_scores(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        """Calculate intensity score (0-100) for each activity based on effort indicators"""
+        duration_hours = columns['duration_hours']
+        avg_hr = columns['average_heartrate']
+        max_hr = columns['max_heartrate']
+        speed = columns['average_speed']
+        
+        # Heart rate intensity
+        hr_mask = (avg_hr != 0) & (max_hr != 0)
+        hr_intensity = np.zeros(len(duration_hours))
+        hr_intensity[hr_mask] = np.minimum((avg_hr[hr_mask] / max_hr[hr_mask]) * 100, 100)
+        
+        # Pace intensity for running, relative to estimated easy pace (assume 6:30/km as moderate)
+        pace_mask = (columns['sport_code'] == SPORT_CODES['Run']) & (speed != 0)
+        pace_intensity = np.zeros(len(duration_hours))
+        pace_per_km = 1000 / (speed[pace_mask] * 60)
+        easy_pace = 6.5
+        pace_intensity[pace_mask] = np.clip((easy_pace / pace_per_km) * 60, 0, 100)
+        
+        # Duration intensity (longer = higher aerobic demand), 4 hours = 100%
+        duration_intensity = np.minimum(100, duration_hours * 25)
+        
+        # Average of the available indicators
+        indicator_count = 1 + hr_mask.astype(np.int64) + pace_mask.astype(np.int64)
+        return np.round((hr_intensity + pace_intensity + duration_intensity) / indicator_count, 1)
     
-    def _classify_workout_type(self, activity: Activity) -> str:
-        """Classify workout type based on activity characteristics"""
-        try:
-            duration_minutes = (activity.moving_time or activity.elapsed_time or 0) / 60
-            distance_km = (activity.distance or 0) / 1000
-            
-            sport_type = activity.sport_type or 'Other'
-            
-            if sport_type == 'Run':
-                if distance_km >= 15:
-                    return 'Long Run'
-                elif duration_minutes <= 30:
-                    return 'Short Run'
-                else:
-                    return 'Base Run'
-            elif sport_type in ['Tennis', 'Strength']:
-                return 'Cross Training'
-            elif sport_type == 'Ride':
-                if duration_minutes >= 120:
-                    return 'Long Ride'
-                else:
-                    return 'Bike Training'
-            else:
-                return 'Other Activity'
-                
-        except Exception:
-            return 'Other Activity'
+    def _classify_workout_types(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        """Classify workout type of each activity as an int8 index into WORKOUT_TYPES"""
+        moving_time = columns['moving_time']
+        duration_minutes = np.where(moving_time != 0, moving_time, columns['elapsed_time']) / 60
+        distance_km = columns['distance'] / 1000
+        sport_code = columns['sport_code']
+        
+        is_run = sport_code == SPORT_CODES['Run']
+        is_ride = sport_code == SPORT_CODES['Ride']
+        conditions = [
+            is_run & (distance_km >= 15),
+            is_run & (duration_minutes <= 30),
+            is_run,
+            (sport_code == SPORT_CODES['Tennis']) | (sport_code == SPORT_CODES['Strength']),
+            is_ride & (duration_minutes >= 120),
+            is_ride
+        ]
+        return np.select(conditions, np.arange(len(conditions), dtype=np.int8), default=len(conditions))
     
-    def _generate_community_insights(self, daily_metrics: Dict, athletes: List) -> List[str]:
+    def _generate_community_insights(self, daily_metrics: Dict, total_athletes: int) -> List[str]:
         """Generate AI-powered insights about community training patterns"""
         insights = []
         
         try:
             # Calculate trends
-            tss_values = [metrics['avg_tss'] for metrics in daily_metrics.values()]
-            consistency_values = [metrics['consistency_score'] for metrics in daily_metrics.values()]
+            tss_values, consistency_values, active_values = (
+                np.fromiter((metrics[key] for metrics in daily_metrics.values()), dtype=dtype, count=len(daily_metrics))
+                for key, dtype in (('avg_tss', np.float64), ('consistency_score', np.float64),
+                                   ('active_athletes', np.int64))
+            )
             
             # TSS trend analysis
             if len(tss_values) >= 3:
@@ -313,14 +364,12 @@ class CommunityAnalytics:
                 insights.append("Opportunity to increase community participation")
             
             # Peak training day analysis
-            peak_day_idx = np.argmax(tss_values)
-            peak_day_metrics = list(daily_metrics.values())[peak_day_idx]
+            peak_day_idx = tss_values.argmax()
             
-            if peak_day_metrics['avg_tss'] > 50:
-                insights.append(f"Peak training day: {peak_day_metrics['active_athletes']} athletes averaging {peak_day_metrics['avg_tss']:.0f} TSS")
+            if tss_values[peak_day_idx] > 50:
+                insights.append(f"Peak training day: {active_values[peak_day_idx]} athletes averaging {tss_values[peak_day_idx]:.0f} TSS")
             
             # Add variety insight
-            total_athletes = len(athletes)
             if total_athletes > 1:
                 insights.append(f"Community diversity: {total_athletes} active athletes with varied training approaches")
             
@@ -332,22 +381,28 @@ class CommunityAnalytics:
     
     def _get_empty_trends(self, days: int) -> Dict:
         """Return empty trends structure"""
-        labels = [(datetime.now() - timedelta(days=days-1-i)).strftime('%m/%d') for i in range(days)]
-        
         return {
-            'labels': labels,
-            'datasets': [
-                {
-                    'label': 'Community TSS',
-                    'data': [0] * days,
-                    'borderColor': 'rgb(34, 197, 94)',
-                    'backgroundColor': 'rgba(34, 197, 94, 0.1)'
-                }
-            ],
+            'labels': list(_trend_labels(datetime.now().date(), days)),
+            'datasets': [{**EMPTY_TRENDS_DATASET, 'data': [0] * days}],
             'insights': ['No community training data available for this period']
         }
 
 def get_enhanced_community_trends(days: int = 7) -> Dict:
     """Global function for enhanced community trends"""
+    latest_start = db.session.execute(select(func.max(Activity.start_date))).scalar()
+    cache_key = (datetime.now().date(), days, latest_start)
+    with _trends_cache_lock:
+        trends = _trends_cache.get(cache_key)
+    if trends is not None:
+        return trends
+    
     analytics = CommunityAnalytics()
-    return analytics.get_enhanced_community_trends(days)
\ No newline at end of file
+    trends = analytics.get_enhanced_community_trends(days)
+    with _trends_cache_lock:
+        _trends_cache[cache_key] = trends
+    return trends
+
+def invalidate_community_trends():
+    """Invalidate cached community trends after new activities are stored"""
+    with _trends_cache_lock:
+        _trends_cache.clear()
\ No newline at end of file
@@ -1,7 +1,10 @@
 import os
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import sys
+import threading
 
 class Config:
     """Configuration class for the Marathon Training Dashboard"""
@@ -12,10 +15,18 @@ class Config:
     # Database configuration - Force SQLite
     SQLALCHEMY_DATABASE_URI = 'sqlite:///marathon.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    # SQLite-specific options
+    # Connection pool sizing - keep enough warm connections for Gunicorn
+    # request threads plus APScheduler jobs without reconnecting per request.
+    # pool_pre_ping costs one cheap round trip per checkout but discards dead
+    # connections; pool_recycle bounds connection age for server-side timeouts.
     SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": int(os.environ.get('DB_POOL_SIZE', '10')),
+        "max_overflow": int(os.environ.get('DB_MAX_OVERFLOW', '20')),
         "pool_timeout": 20,
-        "pool_recycle": -1,
+        "pool_pre_ping": True,
+        "pool_recycle": int(os.environ.get('DB_POOL_RECYCLE', '1800')),
+        # Rows per statement when bulk inserts are batched (e.g. SystemLog bursts)
+        "insertmanyvalues_page_size": 1000,
     }
     
     # JWT configuration
@@ -26,6 +37,9 @@ class Config:
     STRAVA_CLIENT_SECRET = os.environ.get('STRAVA_CLIENT_SECRET')
     STRAVA_CALLBACK_URL = os.environ.get('STRAVA_CALLBACK_URL')
     
+    # Optional Redis for cross-worker caches (disabled when unset)
+    REDIS_URL = os.environ.get('REDIS_URL')
+    
     # AI API configuration
     GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
     
@@ -35,50 +49,61 @@ class Config:
     MAIL_SMTP_USER = os.environ.get('MAIL_SMTP_USER', 'default@email.com')
     MAIL_SMTP_PASSWORD = os.environ.get('MAIL_SMTP_PASSWORD', 'default_password')
     
+    # Background scheduler - seconds a job may start late before the run is skipped
+    SCHEDULER_MISFIRE_GRACE_TIME = int(os.environ.get('SCHEDULER_MISFIRE_GRACE_TIME', '60'))
+    
     # Logging configuration
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
 
+# Queue handler and listener thread shared by every app instance in the process
+_log_queue_handler = None
+_log_listener = None
+_log_setup_lock = threading.Lock()
+
 def configure_replit_logging(app):
     """Configure logging optimized for Replit environment"""
     
     # Set log level
     log_level = getattr(logging, app.config.get('LOG_LEVEL', 'INFO').upper())
     
-    # Create custom formatter with athlete_id support
+    # Create custom formatter with athlete_id support; records without
+    # extra={'athlete_id': ...} fall back to the default
     formatter = logging.Formatter(
-        '%(asctime)s %(levelname)s [%(name)s] [athlete_id:%(athlete_id)s] %(message)s'
+        '%(asctime)s %(levelname)s [%(name)s] [athlete_id:%(athlete_id)s] %(message)s',
+        defaults={'athlete_id': 'N/A'}
     )
     
-    # Custom log record factory to inject athlete_id
-    old_factory = logging.getLogRecordFactory()
-    
-    def record_factory(*args, **kwargs):
-        record = old_factory(*args, **kwargs)
-        record.athlete_id = getattr(record, 'athlete_id', 'N/A')
-        return record
-    
-    logging.setLogRecordFactory(record_factory)
-    
     # Configure root logger
     logging.basicConfig(level=log_level)
     
-    # Add console handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(formatter)
-    
     # Add file handler for persistent logs
+    global _log_queue_handler, _log_listener
     try:
-        file_handler = RotatingFileHandler(
-            'marathon_dashboard.log',
-            maxBytes=10485760,  # 10MB
-            backupCount=3
-        )
-        file_handler.setFormatter(formatter)
-        file_handler.setLevel(log_level)
+        with _log_setup_lock:
+            # create_app() runs again in scheduler jobs, so the listener is set up once per process
+            if _log_listener is None:
+                # Add console handler
+                console_handler = logging.StreamHandler(sys.stdout)
+                console_handler.setFormatter(formatter)
+                
+                file_handler = RotatingFileHandler(
+                    'marathon_dashboard.log',
+                    maxBytes=10485760,  # 10MB
+                    backupCount=3
+                )
+                file_handler.setFormatter(formatter)
+                file_handler.setLevel(log_level)
+                
+                # Handlers run on a background listener thread; logging calls only enqueue records
+                log_queue = queue.SimpleQueue()
+                _log_listener = QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+                _log_listener.start()
+                atexit.register(_log_listener.stop)
+                _log_queue_handler = QueueHandler(log_queue)
+        app.extensions['log_listener'] = _log_listener
         
-        # Add handlers to app logger
-        app.logger.addHandler(console_handler)
-        app.logger.addHandler(file_handler)
+        # Add queue handler to app logger (a no-op if it is already attached)
+        app.logger.addHandler(_log_queue_handler)
         app.logger.setLevel(log_level)
         
     except Exception as e:
@@ -1,17 +1,159 @@
+import bisect
+import json
 import logging
+import math
+import threading
+from collections import namedtuple
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Optional
+from cachetools import TTLCache
+import numpy as np
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import func
-import pandas as pd
+from sqlalchemy import case, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
 from app.models import ReplitAthlete, Activity, PlannedWorkout, DailySummary, SystemLog, db
 
+# Athlete fields read during daily processing
+AthleteSnapshot = namedtuple('AthleteSnapshot', ['name', 'max_hr', 'is_active'])
+
+@dataclass(slots=True)
+class DailyMetrics:
+    """Totals and averages of an athlete's activities for one day"""
+    total_distance: float = 0.0
+    total_moving_time: int = 0
+    total_elevation_gain: float = 0.0
+    activity_count: int = 0
+    average_pace: Optional[float] = None  # seconds per km
+    average_heart_rate: Optional[float] = None
+    training_load: float = 0.0
+
+@dataclass(slots=True)
+class ComplianceMetrics:
+    """Actual vs planned distance and duration, in percent; None without a plan value"""
+    planned_vs_actual_distance: Optional[float] = None
+    planned_vs_actual_duration: Optional[float] = None
+
+# Shared by all processors so batch runs fetch each athlete once; entries expire hourly
+_athlete_snapshots = TTLCache(maxsize=10000, ttl=3600)
+_athlete_snapshots_lock = threading.Lock()
+
+# Insight bands: bisect_right over (low, high) picks the insight for value < low,
+# low <= value <= high and value > high; nextafter makes the high bound inclusive
+_TRAINING_LOAD_BANDS = (50, math.nextafter(150, math.inf))
+_TRAINING_LOAD_INSIGHTS = (
+    ('performance_notes', "Low training load - good for recovery"),
+    None,
+    ('alerts', "High training load detected - consider recovery")
+)
+_HR_PERCENTAGE_BANDS = (65, math.nextafter(85, math.inf))
+_HR_PERCENTAGE_INSIGHTS = (
+    ('performance_notes', "Easy/recovery pace maintained"),
+    None,
+    ('alerts', "High intensity session - ensure adequate recovery")
+)
+_DISTANCE_COMPLIANCE_BANDS = (80, math.nextafter(120, math.inf))
+_DISTANCE_COMPLIANCE_INSIGHTS = (
+    ('recommendations', "Consider completing planned distance in future sessions"),
+    None,
+    ('alerts', "Exceeded planned distance - monitor fatigue levels")
+)
+_LONG_DISTANCE_KM = 25
+
+# Status bands over distance + duration compliance, i.e. average compliance of 50/70/90%;
+# comparing the sum keeps the band edges exact without dividing
+_COMPLIANCE_SUM_BANDS = (100, 140, 180)
+_COMPLIANCE_STATUSES = ("Significantly Off Track", "Under-performed", "Mostly Compliant", "On Track")
+_LONG_DISTANCE_INSIGHT = "Long distance session completed"
+
+# Activity count from which _calculate_daily_metrics sums with NumPy instead of a Python loop
+_VECTORIZED_METRICS_MIN_ACTIVITIES = 64
+
+# Rows fetched per batch when streaming the team overview aggregation
+_TEAM_OVERVIEW_BATCH_SIZE = 500
+
+def _day_bounds(day):
+    """Start and exclusive end datetimes of day, for index-friendly range predicates"""
+    start = datetime.combine(day, datetime.min.time())
+    return start, start + timedelta(days=1)
+
+def _add_band_insight(insights, value, bands, band_insights):
+    """Append the insight for the band containing value, if that band has one"""
+    insight = band_insights[bisect.bisect_right(bands, value)]
+    if insight is not None:
+        category, message = insight
+        insights[category].append(message)
+
+def _compliance_band(distance_compliance, duration_compliance):
+    """Index into _COMPLIANCE_STATUSES, or None unless both compliance values are set"""
+    if distance_compliance and duration_compliance:
+        return bisect.bisect_right(_COMPLIANCE_SUM_BANDS, distance_compliance + duration_compliance)
+    return None
+
+@lru_cache(maxsize=32)
+def _determine_status_pure(has_activities, has_planned_workout, compliance_band):
+    """Status for a day; keyed on the compliance band so recomputed days hit the cache"""
+    if not has_activities:
+        return "Rest Day" if not has_planned_workout else "Missed Workout"
+    
+    if not has_planned_workout:
+        return "Unplanned Training"
+    
+    # Check compliance
+    if compliance_band is not None:
+        return _COMPLIANCE_STATUSES[compliance_band]
+    
+    return "Partially Completed"
+
+def _generate_insights_pure(training_load, total_distance, average_pace, average_heart_rate, max_hr,
+                            distance_compliance):
+    """Insight tuples (notes, recommendations, alerts) for a day's numbers"""
+    insights = {
+        'performance_notes': [],
+        'recommendations': [],
+        'alerts': []
+    }
+    
+    # Performance analysis
+    if training_load > 0:
+        _add_band_insight(insights, training_load, _TRAINING_LOAD_BANDS, _TRAINING_LOAD_INSIGHTS)
+    
+    # Distance analysis
+    if total_distance > 0:
+        if total_distance / 1000 > _LONG_DISTANCE_KM:
+            insights['performance_notes'].append(_LONG_DISTANCE_INSIGHT)
+        
+        # Pace analysis
+        if average_pace:
+            pace_min_per_km = average_pace / 60
+            insights['performance_notes'].append(f"Average pace: {pace_min_per_km:.2f} min/km")
+    
+    # Heart rate analysis
+    if average_heart_rate and max_hr:
+        hr_percentage = (average_heart_rate / max_hr) * 100
+        _add_band_insight(insights, hr_percentage, _HR_PERCENTAGE_BANDS, _HR_PERCENTAGE_INSIGHTS)
+    
+    # Compliance analysis
+    if distance_compliance:
+        _add_band_insight(insights, distance_compliance, _DISTANCE_COMPLIANCE_BANDS,
+                          _DISTANCE_COMPLIANCE_INSIGHTS)
+    
+    return (tuple(insights['performance_notes']), tuple(insights['recommendations']),
+            tuple(insights['alerts']))
+
 class DataProcessor:
     """
     Core data processing logic for athlete performance analysis
     """
     
+    # Write success events to SystemLog too; errors are always persisted
+    persist_success_logs = False
+    
     def __init__(self):
         self.logger = logging.getLogger(__name__)
+        # SystemLog rows waiting for flush_logs
+        self._log_buffer = []
     
     def process_athlete_daily_performance(self, db_session, athlete_id, processing_date):
         """
@@ -22,31 +164,30 @@ class DataProcessor:
             self.logger.info(f"Processing daily performance for athlete {athlete_id} on {processing_date}")
             
             # Get athlete
-            athlete = db_session.query(ReplitAthlete).filter_by(id=athlete_id).first()
+            athlete = self._get_athlete_snapshot(db_session, athlete_id)
             if not athlete:
                 self.logger.error(f"Athlete {athlete_id} not found")
                 return None
             
-            # Get activities for the processing date
-            start_date = datetime.combine(processing_date, datetime.min.time())
-            end_date = start_date + timedelta(days=1)
+            # Time range of the processing date
+            start_date, end_date = _day_bounds(processing_date)
             
-            activities = db_session.query(Activity).filter(
-                Activity.athlete_id == athlete_id,
-                Activity.start_date >= start_date,
-                Activity.start_date < end_date
-            ).all()
+            # Calculate daily metrics from the day's activities
+            daily_metrics = self._aggregate_activities_sql(db_session, athlete_id, start_date, end_date)
             
-            self.logger.info(f"Found {len(activities)} activities for athlete {athlete_id} on {processing_date}")
+            self.logger.info(f"Found {daily_metrics.activity_count} activities for athlete {athlete_id} on {processing_date}")
             
             # Get planned workout for the date
             planned_workout = db_session.query(PlannedWorkout).filter(
                 PlannedWorkout.athlete_id == athlete_id,
-                func.date(PlannedWorkout.planned_date) == processing_date
+                PlannedWorkout.planned_date >= start_date,
+                PlannedWorkout.planned_date < end_date
             ).first()
             
-            # Calculate daily metrics
-            daily_metrics = self._calculate_daily_metrics(activities)
+            # Nothing to record for an unplanned rest day
+            if daily_metrics.activity_count == 0 and not planned_workout:
+                self.logger.info(f"Rest day without a planned workout for athlete {athlete_id}, skipping summary")
+                return None
             
             # Compare with planned workout
             compliance_metrics = self._calculate_compliance_metrics(daily_metrics, planned_workout)
@@ -55,248 +196,252 @@ class DataProcessor:
             status = self._determine_status(daily_metrics, compliance_metrics, planned_workout)
             insights = self._generate_insights(daily_metrics, compliance_metrics, athlete)
             
-            # Update or create daily summary
-            existing_summary = db_session.query(DailySummary).filter(
-                DailySummary.athlete_id == athlete_id,
-                func.date(DailySummary.summary_date) == processing_date
-            ).first()
-            
-            if existing_summary:
-                # Update existing summary
-                self._update_daily_summary(existing_summary, daily_metrics, compliance_metrics, status, insights)
-                self.logger.info(f"Updated existing daily summary for athlete {athlete_id}")
-            else:
-                # Create new summary
-                new_summary = self._create_daily_summary(
-                    athlete_id, processing_date, daily_metrics, compliance_metrics, status, insights
-                )
-                db_session.add(new_summary)
-                self.logger.info(f"Created new daily summary for athlete {athlete_id}")
-            
+            # Insert the daily summary, or update the existing one for the day, in one statement
+            summary = self._upsert_daily_summary(
+                db_session, athlete_id, start_date,
+                self._daily_summary_values(daily_metrics, compliance_metrics, status, insights)
+            )
             db_session.commit()
+            self.logger.info(f"Saved daily summary for athlete {athlete_id}")
             
             # Log successful processing
-            self._log_processing_event(db_session, athlete_id, 'daily_processing_success', {
+            self._log_processing_event(athlete_id, 'daily_processing_success', {
                 'processing_date': processing_date.isoformat(),
-                'activities_count': len(activities),
+                'activities_count': daily_metrics.activity_count,
                 'status': status
             })
+            self.flush_logs(db_session)
             
-            return new_summary if not existing_summary else existing_summary
+            return summary
             
         except Exception as e:
             self.logger.error(f"Failed to process daily performance for athlete {athlete_id}: {str(e)}")
             db_session.rollback()
             
             # Log processing error
-            self._log_processing_event(db_session, athlete_id, 'daily_processing_error', {
+            self._log_processing_event(athlete_id, 'daily_processing_error', {
                 'processing_date': processing_date.isoformat(),
                 'error': str(e)
             })
+            self.flush_logs(db_session)
             
             raise
     
+    def _get_athlete_snapshot(self, db_session, athlete_id):
+        """Get the athlete fields used for processing, cached across calls; None if the athlete does not exist"""
+        with _athlete_snapshots_lock:
+            snapshot = _athlete_snapshots.get(athlete_id)
+        if snapshot is not None:
+            return snapshot
+        
+        row = db_session.query(
+            ReplitAthlete.name, ReplitAthlete.max_hr, ReplitAthlete.is_active
+        ).filter_by(id=athlete_id).first()
+        if row is None:
+            return None
+        
+        snapshot = AthleteSnapshot(*row)
+        with _athlete_snapshots_lock:
+            _athlete_snapshots[athlete_id] = snapshot
+        return snapshot
+    
+    def invalidate_athlete(self, athlete_id):
+        """Drop the cached athlete snapshot after the athlete's profile changes"""
+        with _athlete_snapshots_lock:
+            _athlete_snapshots.pop(athlete_id, None)
+    
+    def _aggregate_activities_sql(self, db_session, athlete_id, start_date, end_date):
+        """Calculate aggregated metrics for an athlete's activities in [start_date, end_date) in the database"""
+        moving_time = func.coalesce(Activity.moving_time, 0)
+        totals = db_session.query(
+            func.coalesce(func.sum(Activity.distance), 0.0),
+            func.coalesce(func.sum(moving_time), 0),
+            func.coalesce(func.sum(Activity.total_elevation_gain), 0.0),
+            func.count(Activity.id),
+            func.coalesce(func.sum(Activity.average_heartrate * moving_time), 0.0),
+            func.coalesce(func.sum(case((Activity.average_heartrate.isnot(None), moving_time), else_=0)), 0),
+            func.coalesce(func.sum(Activity.suffer_score), 0.0)
+        ).filter(
+            Activity.athlete_id == athlete_id,
+            Activity.start_date >= start_date,
+            Activity.start_date < end_date
+        ).one()
+        
+        return self._build_daily_metrics(*totals)
+    
     def _calculate_daily_metrics(self, activities):
         """Calculate aggregated metrics for the day's activities"""
-        if not activities:
-            return {
-                'total_distance': 0.0,
-                'total_moving_time': 0,
-                'total_elevation_gain': 0.0,
-                'activity_count': 0,
-                'average_pace': None,
-                'average_heart_rate': None,
-                'training_load': 0.0
-            }
+        if len(activities) >= _VECTORIZED_METRICS_MIN_ACTIVITIES:
+            return self._calculate_daily_metrics_vectorized(activities)
         
-        # Convert to pandas DataFrame for easier calculation
-        activity_data = []
+        # Accumulate totals in a single pass over the activities
+        total_distance = 0.0
+        total_moving_time = 0
+        total_elevation_gain = 0.0
+        training_load = 0.0
+        hr_weighted_sum = 0.0
+        hr_moving_time = 0
         for activity in activities:
-            activity_data.append({
-                'distance': activity.distance or 0,
-                'moving_time': activity.moving_time or 0,
-                'elevation_gain': activity.total_elevation_gain or 0,
-                'average_heartrate': activity.average_heartrate,
-                'suffer_score': activity.suffer_score or 0
-            })
+            moving_time = activity.moving_time or 0
+            total_distance += activity.distance or 0
+            total_moving_time += moving_time
+            total_elevation_gain += activity.total_elevation_gain or 0
+            training_load += activity.suffer_score or 0
+            if activity.average_heartrate is not None:
+                hr_weighted_sum += activity.average_heartrate * moving_time
+                hr_moving_time += moving_time
+        
+        return self._build_daily_metrics(total_distance, total_moving_time, total_elevation_gain, len(activities),
+                                         hr_weighted_sum, hr_moving_time, training_load)
+    
+    def _calculate_daily_metrics_vectorized(self, activities):
+        """Calculate aggregated metrics for a large batch of activities with NumPy reductions"""
+        def column(name, dtype=np.float64):
+            # Missing values become NaN so they can be masked or zeroed
+            return np.fromiter((getattr(activity, name) for activity in activities), dtype=dtype,
+                               count=len(activities))
         
-        df = pd.DataFrame(activity_data)
+        heart_rate = column('average_heartrate')
+        moving_time = np.nan_to_num(column('moving_time'))
         
-        # Calculate metrics
-        total_distance = df['distance'].sum()
-        total_moving_time = df['moving_time'].sum()
-        total_elevation_gain = df['elevation_gain'].sum()
-        activity_count = len(activities)
+        # Activities without heart rate data give NaN products, which nansum skips,
+        # so no filtered copies of the columns are needed
+        hr_weighted = heart_rate * moving_time
         
+        return self._build_daily_metrics(
+            np.nansum(column('distance')).item(),
+            int(moving_time.sum()),
+            np.nansum(column('total_elevation_gain')).item(),
+            len(activities),
+            np.nansum(hr_weighted).item(),
+            int(np.dot(moving_time, ~np.isnan(heart_rate))),
+            np.nansum(column('suffer_score')).item()
+        )
+    
+    def _build_daily_metrics(self, total_distance, total_moving_time, total_elevation_gain, activity_count,
+                             hr_weighted_sum, hr_moving_time, training_load):
+        """Build the daily metrics from activity totals"""
         # Calculate average pace (if distance and time available)
         average_pace = None
         if total_distance > 0 and total_moving_time > 0:
             average_pace = total_moving_time / (total_distance / 1000)  # seconds per km
         
-        # Calculate average heart rate (weighted by time)
+        # Calculate average heart rate (weighted by time of activities with heart rate data)
         average_heart_rate = None
-        if not df['average_heartrate'].isna().all():
-            # Weight by moving time
-            hr_weighted_sum = (df['average_heartrate'] * df['moving_time']).sum()
-            if total_moving_time > 0:
-                average_heart_rate = hr_weighted_sum / total_moving_time
+        if hr_moving_time > 0:
+            average_heart_rate = hr_weighted_sum / hr_moving_time
         
-        # Calculate training load (sum of suffer scores)
-        training_load = df['suffer_score'].sum()
-        
-        return {
-            'total_distance': total_distance,
-            'total_moving_time': total_moving_time,
-            'total_elevation_gain': total_elevation_gain,
-            'activity_count': activity_count,
-            'average_pace': average_pace,
-            'average_heart_rate': average_heart_rate,
-            'training_load': training_load
-        }
+        return DailyMetrics(
+            total_distance=total_distance,
+            total_moving_time=total_moving_time,
+            total_elevation_gain=total_elevation_gain,
+            activity_count=activity_count,
+            average_pace=average_pace,
+            average_heart_rate=average_heart_rate,
+            training_load=training_load
+        )
     
     def _calculate_compliance_metrics(self, daily_metrics, planned_workout):
         """Calculate compliance between planned and actual performance"""
         if not planned_workout:
-            return {
-                'planned_vs_actual_distance': None,
-                'planned_vs_actual_duration': None
-            }
+            return ComplianceMetrics()
         
         # Distance compliance
         distance_compliance = None
-        if planned_workout.planned_distance and daily_metrics['total_distance'] > 0:
-            distance_compliance = (daily_metrics['total_distance'] / planned_workout.planned_distance) * 100
+        if planned_workout.planned_distance and daily_metrics.total_distance > 0:
+            distance_compliance = (daily_metrics.total_distance / planned_workout.planned_distance) * 100
         
         # Duration compliance
         duration_compliance = None
-        if planned_workout.planned_duration and daily_metrics['total_moving_time'] > 0:
-            duration_compliance = (daily_metrics['total_moving_time'] / planned_workout.planned_duration) * 100
+        if planned_workout.planned_duration and daily_metrics.total_moving_time > 0:
+            duration_compliance = (daily_metrics.total_moving_time / planned_workout.planned_duration) * 100
         
-        return {
-            'planned_vs_actual_distance': distance_compliance,
-            'planned_vs_actual_duration': duration_compliance
-        }
+        return ComplianceMetrics(
+            planned_vs_actual_distance=distance_compliance,
+            planned_vs_actual_duration=duration_compliance
+        )
     
     def _determine_status(self, daily_metrics, compliance_metrics, planned_workout):
         """Determine overall status for the day"""
-        if daily_metrics['activity_count'] == 0:
-            return "Rest Day" if not planned_workout else "Missed Workout"
-        
-        if not planned_workout:
-            return "Unplanned Training"
-        
-        # Check compliance
-        distance_compliance = compliance_metrics.get('planned_vs_actual_distance')
-        duration_compliance = compliance_metrics.get('planned_vs_actual_duration')
-        
-        if distance_compliance and duration_compliance:
-            avg_compliance = (distance_compliance + duration_compliance) / 2
-            
-            if avg_compliance >= 90:
-                return "On Track"
-            elif avg_compliance >= 70:
-                return "Mostly Compliant"
-            elif avg_compliance >= 50:
-                return "Under-performed"
-            else:
-                return "Significantly Off Track"
-        
-        return "Partially Completed"
+        return _determine_status_pure(
+            daily_metrics.activity_count != 0,
+            bool(planned_workout),
+            _compliance_band(compliance_metrics.planned_vs_actual_distance,
+                             compliance_metrics.planned_vs_actual_duration),
+        )
     
     def _generate_insights(self, daily_metrics, compliance_metrics, athlete):
         """Generate AI-powered insights for the athlete"""
-        insights = {
-            'performance_notes': [],
-            'recommendations': [],
-            'alerts': []
+        performance_notes, recommendations, alerts = _generate_insights_pure(
+            daily_metrics.training_load,
+            daily_metrics.total_distance,
+            daily_metrics.average_pace,
+            daily_metrics.average_heart_rate,
+            athlete.max_hr,
+            compliance_metrics.planned_vs_actual_distance,
+        )
+        return {
+            'performance_notes': list(performance_notes),
+            'recommendations': list(recommendations),
+            'alerts': list(alerts)
         }
-        
-        # Performance analysis
-        if daily_metrics['training_load'] > 0:
-            if daily_metrics['training_load'] > 150:
-                insights['alerts'].append("High training load detected - consider recovery")
-            elif daily_metrics['training_load'] < 50:
-                insights['performance_notes'].append("Low training load - good for recovery")
-        
-        # Distance analysis
-        if daily_metrics['total_distance'] > 0:
-            distance_km = daily_metrics['total_distance'] / 1000
-            if distance_km > 25:
-                insights['performance_notes'].append("Long distance session completed")
-            
-            # Pace analysis
-            if daily_metrics['average_pace']:
-                pace_min_per_km = daily_metrics['average_pace'] / 60
-                insights['performance_notes'].append(f"Average pace: {pace_min_per_km:.2f} min/km")
-        
-        # Heart rate analysis
-        if daily_metrics['average_heart_rate'] and athlete.max_hr:
-            hr_percentage = (daily_metrics['average_heart_rate'] / athlete.max_hr) * 100
-            if hr_percentage > 85:
-                insights['alerts'].append("High intensity session - ensure adequate recovery")
-            elif hr_percentage < 65:
-                insights['performance_notes'].append("Easy/recovery pace maintained")
-        
-        # Compliance analysis
-        distance_compliance = compliance_metrics.get('planned_vs_actual_distance')
-        if distance_compliance:
-            if distance_compliance < 80:
-                insights['recommendations'].append("Consider completing planned distance in future sessions")
-            elif distance_compliance > 120:
-                insights['alerts'].append("Exceeded planned distance - monitor fatigue levels")
-        
-        return insights
     
-    def _create_daily_summary(self, athlete_id, processing_date, daily_metrics, compliance_metrics, status, insights):
-        """Create a new daily summary record"""
-        summary = DailySummary(
-            athlete_id=athlete_id,
-            summary_date=processing_date,
-            total_distance=daily_metrics['total_distance'],
-            total_moving_time=daily_metrics['total_moving_time'],
-            total_elevation_gain=daily_metrics['total_elevation_gain'],
-            activity_count=daily_metrics['activity_count'],
-            average_pace=daily_metrics['average_pace'],
-            average_heart_rate=daily_metrics['average_heart_rate'],
-            training_load=daily_metrics['training_load'],
-            planned_vs_actual_distance=compliance_metrics.get('planned_vs_actual_distance'),
-            planned_vs_actual_duration=compliance_metrics.get('planned_vs_actual_duration'),
-            status=status
-        )
-        
-        summary.set_insights(insights)
-        return summary
+    def _daily_summary_values(self, daily_metrics, compliance_metrics, status, insights):
+        """Column values of a daily summary record"""
+        return {
+            'total_distance': daily_metrics.total_distance,
+            'total_moving_time': daily_metrics.total_moving_time,
+            'total_elevation_gain': daily_metrics.total_elevation_gain,
+            'activity_count': daily_metrics.activity_count,
+            'average_pace': daily_metrics.average_pace,
+            'average_heart_rate': daily_metrics.average_heart_rate,
+            'training_load': daily_metrics.training_load,
+            'planned_vs_actual_distance': compliance_metrics.planned_vs_actual_distance,
+            'planned_vs_actual_duration': compliance_metrics.planned_vs_actual_duration,
+            'status': status,
+            'insights': json.dumps(insights)
+        }
+    
+    def _upsert_daily_summary(self, db_session, athlete_id, summary_date, values):
+        """Insert or update the athlete's summary for summary_date and return it"""
+        dialect = sqlite if db_session.get_bind().dialect.name == 'sqlite' else postgresql
+        stmt = dialect.insert(DailySummary).values(
+            athlete_id=athlete_id, summary_date=summary_date, **values
+        ).on_conflict_do_update(
+            index_elements=[DailySummary.athlete_id, DailySummary.summary_date],
+            set_=values
+        ).returning(DailySummary)
+        return db_session.scalars(stmt, execution_options={'populate_existing': True}).one()
     
-    def _update_daily_summary(self, summary, daily_metrics, compliance_metrics, status, insights):
-        """Update an existing daily summary record"""
-        summary.total_distance = daily_metrics['total_distance']
-        summary.total_moving_time = daily_metrics['total_moving_time']
-        summary.total_elevation_gain = daily_metrics['total_elevation_gain']
-        summary.activity_count = daily_metrics['activity_count']
-        summary.average_pace = daily_metrics['average_pace']
-        summary.average_heart_rate = daily_metrics['average_heart_rate']
-        summary.training_load = daily_metrics['training_load']
-        summary.planned_vs_actual_distance = compliance_metrics.get('planned_vs_actual_distance')
-        summary.planned_vs_actual_duration = compliance_metrics.get('planned_vs_actual_duration')
-        summary.status = status
-        summary.set_insights(insights)
+    def _log_processing_event(self, athlete_id, event_type, context):
+        """Buffer a processing event for debugging and monitoring; written by flush_logs"""
+        if not event_type.endswith('_error') and not (
+            self.persist_success_logs and self.logger.isEnabledFor(logging.INFO)
+        ):
+            return
+        
+        self._log_buffer.append({
+            'timestamp': datetime.now(),
+            'level': 'INFO' if 'success' in event_type else 'ERROR',
+            'message': f"Data processing event: {event_type}",
+            'module': 'data_processor',
+            'athlete_id': athlete_id,
+            'context': json.dumps(context)
+        })
     
-    def _log_processing_event(self, db_session, athlete_id, event_type, context):
-        """Log processing events for debugging and monitoring"""
+    def flush_logs(self, db_session):
+        """Write buffered processing events with a single executemany round trip"""
+        if not self._log_buffer:
+            return
+        
         try:
-            log_entry = SystemLog(
-                level='INFO' if 'success' in event_type else 'ERROR',
-                message=f"Data processing event: {event_type}",
-                module='data_processor',
-                athlete_id=athlete_id
-            )
-            log_entry.set_context(context)
-            
-            db_session.add(log_entry)
+            db_session.execute(insert(SystemLog), self._log_buffer)
             db_session.commit()
-            
         except Exception as e:
-            self.logger.error(f"Failed to log processing event: {str(e)}")
+            db_session.rollback()
+            self.logger.error(f"Failed to log processing events: {str(e)}")
+        finally:
+            self._log_buffer.clear()
     
     def get_athlete_performance_summary(self, db_session, athlete_id, days=30):
         """
@@ -309,28 +454,32 @@ class DataProcessor:
             end_date = datetime.now().date()
             start_date = end_date - timedelta(days=days)
             
-            # Get activities for the period directly
-            activities = db_session.query(Activity).filter(
+            # Time range covering whole days so the start_date index can be used
+            range_start, _ = _day_bounds(start_date)
+            _, range_end = _day_bounds(end_date)
+            
+            in_period = (
                 Activity.athlete_id == athlete_id,
-                func.date(Activity.start_date) >= start_date,
-                func.date(Activity.start_date) <= end_date
-            ).order_by(Activity.start_date.desc()).all()
+                Activity.start_date >= range_start,
+                Activity.start_date < range_end
+            )
             
-            if not activities:
+            # Calculate totals and average heart rate (ignoring missing/zero values) in the database
+            total_distance, total_moving_time, total_elevation_gain, activity_count, avg_heart_rate = db_session.execute(
+                select(
+                    func.coalesce(func.sum(Activity.distance), 0),
+                    func.coalesce(func.sum(Activity.moving_time), 0),
+                    func.coalesce(func.sum(Activity.total_elevation_gain), 0),
+                    func.count(Activity.id),
+                    func.avg(func.nullif(Activity.average_heartrate, 0))
+                ).where(*in_period)
+            ).one()
+            
+            if not activity_count:
                 self.logger.warning(f"No activities found for athlete {athlete_id}")
                 return None
             
-            # Calculate totals from activities
-            total_distance = sum(activity.distance or 0 for activity in activities) / 1000  # Convert to km
-            total_moving_time = sum(activity.moving_time or 0 for activity in activities)
-            total_elevation_gain = sum(activity.total_elevation_gain or 0 for activity in activities)
-            activity_count = len(activities)
-            
-            # Calculate averages
-            avg_heart_rate = None
-            heart_rates = [activity.average_heartrate for activity in activities if activity.average_heartrate]
-            if heart_rates:
-                avg_heart_rate = sum(heart_rates) / len(heart_rates)
+            total_distance = total_distance / 1000  # Convert to km
             
             # Calculate average pace (min/km)
             avg_pace = None
@@ -341,9 +490,17 @@ class DataProcessor:
             # Training load estimation
             training_load = activity_count * 50  # Simple estimation
             
+            # Most recent activities as plain rows of the displayed columns
+            recent_activities = db_session.execute(
+                select(
+                    Activity.id, Activity.name, Activity.sport_type, Activity.start_date, Activity.distance,
+                    Activity.moving_time, Activity.average_heartrate, Activity.calories
+                ).where(*in_period).order_by(Activity.start_date.desc()).limit(10)
+            ).all()
+            
             # Convert activities to dictionaries for JSON serialization
             activities_data = []
-            for activity in activities[:10]:
+            for activity in recent_activities:
                 activities_data.append({
                     'id': activity.id,
                     'name': activity.name,
@@ -381,38 +538,65 @@ class DataProcessor:
             end_date = datetime.now().date()
             start_date = end_date - timedelta(days=days)
             
-            # Get all active athletes
-            active_athletes = db_session.query(ReplitAthlete).filter_by(is_active=True).all()
+            # Time range covering whole days so the summary_date index can be used
+            range_start, _ = _day_bounds(start_date)
+            _, range_end = _day_bounds(end_date)
+            
+            in_range = (
+                DailySummary.summary_date >= range_start,
+                DailySummary.summary_date < range_end
+            )
+            
+            # Per-athlete totals for all active athletes with summaries in one query,
+            # streamed in batches so large teams are not materialized at once
+            athlete_totals = db_session.execute(
+                select(
+                    ReplitAthlete.id,
+                    ReplitAthlete.name,
+                    func.sum(DailySummary.total_distance),
+                    func.sum(DailySummary.activity_count),
+                    func.sum(case((DailySummary.activity_count > 0, 1), else_=0))
+                ).join(
+                    DailySummary, DailySummary.athlete_id == ReplitAthlete.id
+                ).where(
+                    ReplitAthlete.is_active == True,
+                    *in_range
+                ).group_by(ReplitAthlete.id, ReplitAthlete.name).order_by(ReplitAthlete.id).execution_options(
+                    stream_results=True, yield_per=_TEAM_OVERVIEW_BATCH_SIZE
+                )
+            )
+            
+            # Status of each athlete's most recent summary in the period
+            latest_status = dict(db_session.execute(
+                select(DailySummary.athlete_id, DailySummary.status).where(
+                    *in_range
+                ).order_by(DailySummary.summary_date, DailySummary.id)
+            ).all())
             
             team_data = []
-            for athlete in active_athletes:
-                # Get recent summaries for this athlete
-                summaries = db_session.query(DailySummary).filter(
-                    DailySummary.athlete_id == athlete.id,
-                    func.date(DailySummary.summary_date) >= start_date,
-                    func.date(DailySummary.summary_date) <= end_date
-                ).all()
-                
-                if summaries:
-                    athlete_metrics = {
-                        'athlete_id': athlete.id,
-                        'athlete_name': athlete.name,
-                        'total_distance': sum(s.total_distance for s in summaries),
-                        'total_activities': sum(s.activity_count for s in summaries),
-                        'active_days': len([s for s in summaries if s.activity_count > 0]),
-                        'latest_status': summaries[-1].status if summaries else 'No Data'
-                    }
-                    team_data.append(athlete_metrics)
+            for athlete_id, athlete_name, total_distance, total_activities, active_days in athlete_totals:
+                team_data.append({
+                    'athlete_id': athlete_id,
+                    'athlete_name': athlete_name,
+                    'total_distance': total_distance,
+                    'total_activities': total_activities,
+                    'active_days': active_days,
+                    'latest_status': latest_status.get(athlete_id, 'No Data')
+                })
             
             # Calculate team aggregates
             if team_data:
+                distances = np.fromiter((a['total_distance'] for a in team_data), dtype=np.float64,
+                                        count=len(team_data))
+                activity_totals = np.fromiter((a['total_activities'] for a in team_data), dtype=np.int64,
+                                              count=len(team_data))
                 team_overview = {
                     'period': f"{start_date} to {end_date}",
                     'total_athletes': len(team_data),
-                    'total_team_distance': sum(a['total_distance'] for a in team_data),
-                    'total_team_activities': sum(a['total_activities'] for a in team_data),
-                    'average_distance_per_athlete': sum(a['total_distance'] for a in team_data) / len(team_data),
-                    'most_active_athlete': max(team_data, key=lambda x: x['total_distance'])['athlete_name'],
+                    'total_team_distance': distances.sum().item(),
+                    'total_team_activities': activity_totals.sum().item(),
+                    'average_distance_per_athlete': distances.mean().item(),
+                    'most_active_athlete': team_data[distances.argmax()]['athlete_name'],
                     'athlete_details': team_data
                 }
             else:
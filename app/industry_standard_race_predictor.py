@@ -9,62 +9,144 @@ Based on established sports science methodologies and best practices from:
 """
 
 import logging
+import threading
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import timedelta
+from functools import lru_cache
+from itertools import chain, repeat
 from typing import Dict, List, Optional, Tuple
+from cachetools import TTLCache
 from app.models import Activity, ReplitAthlete
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
 
+# Recent predictions keyed by (athlete_id, race distance, weeks to race, latest activity start date)
+_prediction_cache = TTLCache(maxsize=4096, ttl=300)
+_prediction_cache_lock = threading.Lock()
+
+# Fixed parts of every industry-standard prediction (sources is shared, hence a tuple)
+_METHODOLOGY = 'industry_standard_sports_science'
+_SOURCES = ('Jack Daniels VDOT', 'McMillan Calculator', 'Riegel Formula')
+
+# Activity rows fetched per batch when streaming recent runs
+_RUNS_BATCH_SIZE = 500
+
+# Pace trend is fitted over the last 5 runs; x offsets from their mean index and the sum of their squares
+_TREND_RUNS = 5
+_TREND_X_OFFSETS = np.arange(_TREND_RUNS) - (_TREND_RUNS - 1) / 2
+_TREND_X_SUM_SQUARES = float((_TREND_X_OFFSETS ** 2).sum())
+
+@lru_cache(maxsize=64)
+def _recency_weights(count: int) -> np.ndarray:
+    """Exponential weights (decay factor 0.2) for count runs, most recent first; read-only, shared"""
+    weights = np.exp(-np.arange(count) * 0.2)
+    weights.setflags(write=False)
+    return weights
+
+# Numeric core of a prediction as plain functions of numbers and lookup arrays; every argument
+# may also be an array with one entry per athlete, which the batched prediction relies on
+
+def _vdot_core(pace, weekly_volume, consistency, vdot_paces, vdot_values):
+    """VDOT of the closest table pace, adjusted for training volume and consistency"""
+    # Closest table pace (the slower neighbour's pace wins exact ties)
+    idx = np.minimum(np.searchsorted(vdot_paces, pace), len(vdot_paces) - 1)
+    lower = np.maximum(idx - 1, 0)
+    idx = np.where((idx > 0) & (np.abs(vdot_paces[lower] - pace) <= np.abs(vdot_paces[idx] - pace)), lower, idx)
+    
+    volume_factor = np.minimum(1.1, weekly_volume / 40)  # Cap at 10% bonus
+    adjusted_vdot = vdot_values[idx] * volume_factor * (0.8 + 0.2 * consistency)
+    
+    return np.clip(adjusted_vdot, 15, 85)  # Reasonable VDOT range
+
+def _equivalent_race_time_core(pace, ratio):
+    """Race time in seconds from training pace, scaling the estimated 10K time by ratio"""
+    # Training pace is typically 15-20% slower than race pace
+    race_pace_adjustment = 0.85  # 15% faster than training pace
+    estimated_10k_time = pace * race_pace_adjustment * 10 * 60  # Convert to seconds
+    return estimated_10k_time * ratio
+
+def _training_adaptation_core(base_improvement, pace_trend, weekly_volume,
+                              trend_modifiers, volume_thresholds, volume_modifiers):
+    """Base improvement scaled by the trend and volume modifiers, capped at 15% to maintain realism"""
+    improvement_modifier = trend_modifiers[np.greater(pace_trend, 0).astype(np.intp)]
+    volume_modifier = volume_modifiers[np.searchsorted(volume_thresholds, weekly_volume, side='right')]
+    return np.minimum(0.15, base_improvement * improvement_modifier * volume_modifier)
+
 class IndustryStandardRacePredictor:
     """
     Race predictor using industry-standard methodologies from sports science research
     """
     
+    # VDOT table based on Jack Daniels' research (lookup tables are class-level, shared by all instances)
+    vdot_table = {
+        # pace_per_km: vdot_value
+        4.0: 70, 4.2: 65, 4.4: 60, 4.6: 55, 5.0: 50,
+        5.2: 47, 5.4: 45, 5.6: 43, 5.8: 41, 6.0: 39,
+        6.2: 37, 6.4: 35, 6.6: 33, 6.8: 31, 7.0: 29,
+        7.2: 27, 7.4: 25, 7.6: 23, 7.8: 21, 8.0: 19
+    }
+    
+    # VDOT table as sorted arrays for searchsorted lookups
+    _vdot_paces, _vdot_values = map(np.array, zip(*sorted(vdot_table.items())))
+    
+    # Riegel's formula exponents for different distances
+    riegel_exponents = {
+        5.0: 1.06,     # 5K
+        10.0: 1.06,    # 10K  
+        21.0975: 1.06, # Half Marathon
+        42.195: 1.06   # Marathon
+    }
+    
+    # McMillan equivalent race times (based on 10K time)
+    mcmillan_ratios = {
+        5.0: 0.478,     # 5K is ~47.8% of 10K time
+        10.0: 1.0,      # 10K baseline
+        21.0975: 2.14,  # Half is ~2.14x 10K time
+        42.195: 4.67    # Marathon is ~4.67x 10K time
+    }
+    
+    # Training adaptation rates (conservative, evidence-based)
+    adaptation_rates = {
+        'aerobic_base': 0.004,      # 0.4% per week (conservative)
+        'lactate_threshold': 0.005,  # 0.5% per week
+        'vo2_max': 0.003,           # 0.3% per week
+        'neuromuscular': 0.002      # 0.2% per week
+    }
+    
+    # Distance-specific energy system contributions
+    energy_systems = {
+        5.0: {'aerobic': 0.15, 'lactate': 0.35, 'vo2': 0.40, 'neuromuscular': 0.10},
+        10.0: {'aerobic': 0.25, 'lactate': 0.50, 'vo2': 0.20, 'neuromuscular': 0.05},
+        21.0975: {'aerobic': 0.60, 'lactate': 0.35, 'vo2': 0.04, 'neuromuscular': 0.01},
+        42.195: {'aerobic': 0.80, 'lactate': 0.18, 'vo2': 0.02, 'neuromuscular': 0.00}
+    }
+    
+    # Energy systems as a (distance x system) contribution matrix and a per-system weekly rate vector.
+    # Systems without an entry in adaptation_rates (only 'neuromuscular' shares a name) adapt at 0.
+    _energy_rows = {distance: row for row, distance in enumerate(energy_systems)}
+    _energy_matrix = np.array([tuple(contrib.values()) for contrib in energy_systems.values()])
+    _energy_rates = np.array([*map(adaptation_rates.get, energy_systems[42.195], repeat(0.0))])
+    
+    # Step tables: searchsorted(thresholds, value, side='right') counts the thresholds reached
+    # and indexes the matching modifier or confidence bonus
+    _trend_modifiers = np.array([1.0, 1.2])  # 20% bonus for positive trend
+    _volume_thresholds = np.array([30, 50])
+    _volume_modifiers = np.array([1.0, 1.05, 1.1])
+    _activity_count_thresholds = np.array([5, 8])
+    _activity_count_confidence = np.array([0.0, 0.1, 0.2])
+    _consistency_thresholds = np.array([2, 3])
+    _consistency_confidence = np.array([0.0, 0.1, 0.15])
+    _weeks_thresholds = np.array([8, 12])
+    _weeks_confidence = np.array([0.0, 0.05, 0.1])
+    _volume_confidence_thresholds = np.array([30])
+    _volume_confidence = np.array([0.0, 0.1])
+    
     def __init__(self):
         self.logger = logging.getLogger(__name__)
-        
-        # VDOT table based on Jack Daniels' research
-        self.vdot_table = {
-            # pace_per_km: vdot_value
-            4.0: 70, 4.2: 65, 4.4: 60, 4.6: 55, 5.0: 50,
-            5.2: 47, 5.4: 45, 5.6: 43, 5.8: 41, 6.0: 39,
-            6.2: 37, 6.4: 35, 6.6: 33, 6.8: 31, 7.0: 29,
-            7.2: 27, 7.4: 25, 7.6: 23, 7.8: 21, 8.0: 19
-        }
-        
-        # Riegel's formula exponents for different distances
-        self.riegel_exponents = {
-            5.0: 1.06,     # 5K
-            10.0: 1.06,    # 10K  
-            21.0975: 1.06, # Half Marathon
-            42.195: 1.06   # Marathon
-        }
-        
-        # McMillan equivalent race times (based on 10K time)
-        self.mcmillan_ratios = {
-            5.0: 0.478,     # 5K is ~47.8% of 10K time
-            10.0: 1.0,      # 10K baseline
-            21.0975: 2.14,  # Half is ~2.14x 10K time
-            42.195: 4.67    # Marathon is ~4.67x 10K time
-        }
-        
-        # Training adaptation rates (conservative, evidence-based)
-        self.adaptation_rates = {
-            'aerobic_base': 0.004,      # 0.4% per week (conservative)
-            'lactate_threshold': 0.005,  # 0.5% per week
-            'vo2_max': 0.003,           # 0.3% per week
-            'neuromuscular': 0.002      # 0.2% per week
-        }
-        
-        # Distance-specific energy system contributions
-        self.energy_systems = {
-            5.0: {'aerobic': 0.15, 'lactate': 0.35, 'vo2': 0.40, 'neuromuscular': 0.10},
-            10.0: {'aerobic': 0.25, 'lactate': 0.50, 'vo2': 0.20, 'neuromuscular': 0.05},
-            21.0975: {'aerobic': 0.60, 'lactate': 0.35, 'vo2': 0.04, 'neuromuscular': 0.01},
-            42.195: {'aerobic': 0.80, 'lactate': 0.18, 'vo2': 0.02, 'neuromuscular': 0.00}
-        }
+        # Race time ratio per distance: McMillan for standard races, memoized Riegel otherwise
+        self._distance_ratio = dict(self.mcmillan_ratios)
     
     def predict_race_time(self, db_session: Session, athlete_id: int, 
                          race_distance_km: float, weeks_to_race: int = 12) -> Dict:
@@ -84,6 +166,69 @@ class IndustryStandardRacePredictor:
         # Step 1: Calculate current fitness level using recent performance
         current_fitness = self._calculate_current_fitness(db_session, athlete_id)
         
+        return self._predict_from_fitness(current_fitness, race_distance_km, weeks_to_race)
+    
+    def predict_race_time_many(self, db_session: Session, athlete_ids: List[int],
+                               race_distance_km: float, weeks_to_race: int = 12) -> Dict[int, Dict]:
+        """
+        Predict race times for several athletes with a single activity query
+        
+        Returns:
+            Race prediction per athlete ID, as returned by predict_race_time
+        """
+        fitness_by_athlete = self._calculate_current_fitness_many(db_session, athlete_ids)
+        valid_ids = [athlete_id for athlete_id, fitness in fitness_by_athlete.items() if fitness['valid']]
+        
+        predictions = {
+            athlete_id: self._generate_fallback_prediction(race_distance_km)
+            for athlete_id, fitness in fitness_by_athlete.items() if not fitness['valid']
+        }
+        if valid_ids:
+            fitness_rows = [fitness_by_athlete[athlete_id] for athlete_id in valid_ids]
+            
+            def column(key):
+                return np.fromiter((fitness[key] for fitness in fitness_rows), dtype=np.float64,
+                                   count=len(fitness_rows))
+            
+            paces = column('current_pace_per_km')
+            weekly_volumes = column('weekly_volume_km')
+            
+            # Steps 2-5 for all athletes at once
+            estimated_vdots = _vdot_core(paces, weekly_volumes, column('training_consistency'),
+                                         self._vdot_paces, self._vdot_values)
+            current_race_times = _equivalent_race_time_core(paces, self._race_time_ratio(race_distance_km))
+            if weeks_to_race <= 0:
+                training_improvements = np.zeros(len(valid_ids))
+            else:
+                training_improvements = _training_adaptation_core(
+                    self._base_improvement(race_distance_km, weeks_to_race), column('pace_trend'), weekly_volumes,
+                    self._trend_modifiers, self._volume_thresholds, self._volume_modifiers
+                )
+            distance_adjusted_times = self._apply_riegel_formula(
+                current_race_times, training_improvements, race_distance_km
+            )
+            
+            # Step 6 for all athletes at once
+            confidence_scores = self._calculate_confidence({
+                key: column(key)
+                for key in ('recent_activities_count', 'training_consistency', 'weekly_volume_km')
+            }, weeks_to_race)
+            
+            for athlete_id, fitness, estimated_vdot, training_improvement, distance_adjusted_time, confidence_score in zip(
+                valid_ids, fitness_rows, estimated_vdots.tolist(), training_improvements.tolist(),
+                distance_adjusted_times.tolist(), confidence_scores.tolist()
+            ):
+                predictions[athlete_id] = self._prediction_result(
+                    fitness, race_distance_km, weeks_to_race, estimated_vdot, training_improvement,
+                    distance_adjusted_time, confidence_score
+                )
+        
+        return {athlete_id: predictions[athlete_id] for athlete_id in athlete_ids}
+    
+    def _predict_from_fitness(self, current_fitness: Dict, race_distance_km: float, weeks_to_race: int) -> Dict:
+        """
+        Race prediction (steps 2-6) from an athlete's current fitness
+        """
         if not current_fitness['valid']:
             return self._generate_fallback_prediction(race_distance_km)
         
@@ -105,9 +250,20 @@ class IndustryStandardRacePredictor:
             current_race_time, training_improvement, race_distance_km
         )
         
-        # Step 6: Calculate confidence and provide methodology details
+        # Step 6: Calculate confidence
         confidence_score = self._calculate_confidence(current_fitness, weeks_to_race)
         
+        return self._prediction_result(
+            current_fitness, race_distance_km, weeks_to_race, estimated_vdot, training_improvement,
+            distance_adjusted_time, confidence_score
+        )
+    
+    def _prediction_result(self, current_fitness: Dict, race_distance_km: float, weeks_to_race: int,
+                           estimated_vdot: float, training_improvement: float, distance_adjusted_time: float,
+                           confidence_score: float) -> Dict:
+        """
+        Prediction response from the computed steps, with methodology details
+        """
         return {
             'race_distance_km': race_distance_km,
             'predicted_time_seconds': distance_adjusted_time,
@@ -116,8 +272,8 @@ class IndustryStandardRacePredictor:
             'estimated_vdot': estimated_vdot,
             'training_improvement_percent': training_improvement * 100,
             'confidence_score': confidence_score,
-            'methodology': 'industry_standard_sports_science',
-            'sources': ['Jack Daniels VDOT', 'McMillan Calculator', 'Riegel Formula'],
+            'methodology': _METHODOLOGY,
+            'sources': _SOURCES,
             'weeks_to_race': weeks_to_race
         }
     
@@ -127,58 +283,37 @@ class IndustryStandardRacePredictor:
         Industry standard: Weight recent performances more heavily
         """
         
-        # Get last 30 days of quality runs (>2km)
-        cutoff_date = datetime.now() - timedelta(days=30)
-        activities = db_session.query(Activity).filter(
+        # Get last 30 days of quality runs (>2km) as (distance, moving_time) rows, most recent first
+        runs = self._stream_runs(db_session, select(Activity.distance, Activity.moving_time).where(
             Activity.athlete_id == athlete_id,
-            Activity.start_date >= cutoff_date,
-            Activity.sport_type.in_(['Run', 'VirtualRun']),
-            Activity.distance > 2000,  # At least 2km
-            Activity.moving_time > 600  # At least 10 minutes
-        ).order_by(Activity.start_date.desc()).all()
+            *self._recent_runs_criteria(db_session)
+        ).order_by(Activity.start_date.desc()))
+        run_count = len(runs)
         
-        if len(activities) < 3:
+        if run_count < 3:
             return {'valid': False, 'reason': 'insufficient_recent_data'}
         
-        # Calculate weighted average pace (recent runs weighted more heavily)
-        weighted_paces = []
-        weights = []
-        
-        for i, activity in enumerate(activities):
-            if activity.distance and activity.moving_time:
-                pace_per_km = (activity.moving_time / 60) / (activity.distance / 1000)
-                
-                # Exponential weighting: most recent run gets highest weight
-                weight = np.exp(-i * 0.2)  # Decay factor of 0.2
-                
-                weighted_paces.append(pace_per_km * weight)
-                weights.append(weight)
+        # Pace of each run (the query only returns runs with distance and time)
+        distances, moving_times = runs[:, 0], runs[:, 1]
+        paces = (moving_times / 60) / (distances / 1000)
         
-        if not weights:
-            return {'valid': False, 'reason': 'no_valid_activities'}
-        
-        current_pace = sum(weighted_paces) / sum(weights)
+        # Calculate weighted average pace (recent runs weighted more heavily)
+        # Exponential weighting: most recent run gets highest weight, decay factor of 0.2
+        weights = _recency_weights(len(paces))
+        current_pace = (paces * weights).sum() / weights.sum()
         
         # Calculate training volume and consistency
-        total_distance = sum(a.distance / 1000 for a in activities if a.distance)
-        weeks_span = max(1, len(activities) / 3.5)  # Approximate weeks in 30 days
+        total_distance = (distances / 1000).sum().item()
+        weeks_span = max(1, run_count / 3.5)  # Approximate weeks in 30 days
         weekly_volume = total_distance / weeks_span
         
         # Analyze pace trend (improvement = negative slope)
-        if len(activities) >= 5:
-            recent_paces = []
-            for activity in activities[:5]:  # Last 5 runs
-                if activity.distance and activity.moving_time:
-                    pace = (activity.moving_time / 60) / (activity.distance / 1000)
-                    recent_paces.append(pace)
+        if run_count >= _TREND_RUNS:
+            recent_paces = paces[:_TREND_RUNS]  # Last 5 runs
             
-            if len(recent_paces) >= 3:
-                # Linear regression for trend
-                x = np.arange(len(recent_paces))
-                trend_slope = np.polyfit(x, recent_paces, 1)[0]
-                pace_trend = -trend_slope  # Negative slope = improvement
-            else:
-                pace_trend = 0.0
+            # Least-squares slope for trend (closed form for a degree-1 fit)
+            trend_slope = (_TREND_X_OFFSETS * (recent_paces - recent_paces.mean())).sum() / _TREND_X_SUM_SQUARES
+            pace_trend = -trend_slope  # Negative slope = improvement
         else:
             pace_trend = 0.0
         
@@ -187,52 +322,122 @@ class IndustryStandardRacePredictor:
             'current_pace_per_km': current_pace,
             'weekly_volume_km': weekly_volume,
             'pace_trend': pace_trend,
-            'recent_activities_count': len(activities),
-            'longest_recent_run_km': max((a.distance / 1000 for a in activities if a.distance), default=0),
-            'training_consistency': len(activities) / 12  # Activities per week over 30 days
+            'recent_activities_count': run_count,
+            'longest_recent_run_km': (distances.max() / 1000).item(),
+            'training_consistency': run_count / 12  # Activities per week over 30 days
         }
     
+    def _stream_runs(self, db_session: Session, stmt) -> np.ndarray:
+        """
+        Run the numeric column query and return its rows as a float matrix, streaming the
+        result in batches instead of materializing row objects
+        """
+        result = db_session.execute(stmt.execution_options(yield_per=_RUNS_BATCH_SIZE))
+        values = np.fromiter(chain.from_iterable(result), dtype=np.float64)
+        return values.reshape(-1, len(stmt.selected_columns))
+    
+    def _recent_runs_criteria(self, db_session: Session) -> Tuple:
+        """
+        Filter for the quality runs of the last 30 days that current fitness is based on
+        """
+        # Cutoff (local time, as stored) computed by the database, so every call sends the same statement
+        if db_session.get_bind().dialect.name == 'sqlite':
+            cutoff_date = func.datetime('now', 'localtime', '-30 days')
+        else:
+            cutoff_date = func.localtimestamp() - timedelta(days=30)
+        return (
+            Activity.start_date >= cutoff_date,
+            Activity.sport_type.in_(['Run', 'VirtualRun']),
+            Activity.distance > 2000,  # At least 2km
+            Activity.moving_time > 600  # At least 10 minutes
+        )
+    
+    def _calculate_current_fitness_many(self, db_session: Session, athlete_ids: List[int]) -> Dict[int, Dict]:
+        """
+        Current fitness for several athletes from one query, reduced per athlete with NumPy segment sums
+        """
+        fitness_by_athlete = {athlete_id: {'valid': False, 'reason': 'insufficient_recent_data'}
+                              for athlete_id in athlete_ids}
+        if not athlete_ids:
+            return fitness_by_athlete
+        
+        runs = self._stream_runs(db_session, select(
+            Activity.athlete_id, Activity.distance, Activity.moving_time
+        ).where(
+            Activity.athlete_id.in_(set(athlete_ids)),
+            *self._recent_runs_criteria(db_session)
+        ).order_by(Activity.athlete_id, Activity.start_date.desc()))
+        if not len(runs):
+            return fitness_by_athlete
+        
+        # One segment of runs per athlete, most recent first within each segment
+        row_athletes = runs[:, 0].astype(np.int64)
+        distances, moving_times = runs[:, 1], runs[:, 2]
+        segment_athletes, starts, counts = np.unique(row_athletes, return_index=True, return_counts=True)
+        ranks = np.arange(len(runs)) - np.repeat(starts, counts)
+        
+        # Weighted average pace, volume and longest run per athlete (same formulas as _calculate_current_fitness)
+        paces = (moving_times / 60) / (distances / 1000)
+        weights = _recency_weights(int(counts.max()))[ranks]
+        current_paces = np.add.reduceat(paces * weights, starts) / np.add.reduceat(weights, starts)
+        weekly_volumes = np.add.reduceat(distances / 1000, starts) / np.maximum(1, counts / 3.5)
+        longest_runs = np.maximum.reduceat(distances, starts) / 1000
+        
+        # Pace trend over the last 5 runs of athletes that have them
+        pace_trends = np.zeros(len(segment_athletes))
+        has_trend = counts >= _TREND_RUNS
+        recent_paces = paces[starts[has_trend, np.newaxis] + np.arange(_TREND_RUNS)]
+        pace_trends[has_trend] = -(
+            (_TREND_X_OFFSETS * (recent_paces - recent_paces.mean(axis=1, keepdims=True))).sum(axis=1)
+            / _TREND_X_SUM_SQUARES
+        )
+        
+        for athlete_id, count, current_pace, weekly_volume, pace_trend, longest_run in zip(
+            segment_athletes.tolist(), counts.tolist(), current_paces.tolist(), weekly_volumes.tolist(),
+            pace_trends.tolist(), longest_runs.tolist()
+        ):
+            if count < 3:
+                continue
+            fitness_by_athlete[athlete_id] = {
+                'valid': True,
+                'current_pace_per_km': current_pace,
+                'weekly_volume_km': weekly_volume,
+                'pace_trend': pace_trend,
+                'recent_activities_count': count,
+                'longest_recent_run_km': longest_run,
+                'training_consistency': count / 12  # Activities per week over 30 days
+            }
+        
+        return fitness_by_athlete
+    
     def _estimate_vdot(self, fitness_data: Dict) -> float:
         """
         Estimate VDOT using Jack Daniels' methodology
         """
-        current_pace = fitness_data['current_pace_per_km']
-        
-        # Find closest VDOT value from table
-        closest_pace = min(self.vdot_table.keys(), key=lambda x: abs(x - current_pace))
-        estimated_vdot = self.vdot_table[closest_pace]
-        
-        # Adjust based on training volume and consistency
-        volume_factor = min(1.1, fitness_data['weekly_volume_km'] / 40)  # Cap at 10% bonus
-        consistency_factor = fitness_data['training_consistency']
-        
-        adjusted_vdot = estimated_vdot * volume_factor * (0.8 + 0.2 * consistency_factor)
-        
-        return max(15, min(85, adjusted_vdot))  # Reasonable VDOT range
+        return _vdot_core(
+            fitness_data['current_pace_per_km'], fitness_data['weekly_volume_km'],
+            fitness_data['training_consistency'], self._vdot_paces, self._vdot_values
+        ).item()
     
     def _calculate_equivalent_race_time(self, fitness_data: Dict, target_distance: float) -> float:
         """
         Calculate equivalent race time using McMillan ratios
         Based on current 10K equivalent performance
         """
-        current_pace = fitness_data['current_pace_per_km']
-        
-        # Estimate current 10K time from training pace
-        # Training pace is typically 15-20% slower than race pace
-        race_pace_adjustment = 0.85  # 15% faster than training pace
-        estimated_10k_pace = current_pace * race_pace_adjustment
-        estimated_10k_time = estimated_10k_pace * 10 * 60  # Convert to seconds
-        
-        # Use McMillan ratios to predict target distance
-        if target_distance in self.mcmillan_ratios:
-            ratio = self.mcmillan_ratios[target_distance]
-            predicted_time = estimated_10k_time * ratio
-        else:
+        # Estimate current 10K time from training pace and scale it to the target distance
+        return _equivalent_race_time_core(
+            fitness_data['current_pace_per_km'], self._race_time_ratio(target_distance)
+        )
+    
+    def _race_time_ratio(self, target_distance: float) -> float:
+        """
+        Ratio of the target distance's race time to the 10K time
+        """
+        ratio = self._distance_ratio.get(target_distance)
+        if ratio is None:
             # Use Riegel's formula for non-standard distances
-            ratio = (target_distance / 10.0) ** 1.06
-            predicted_time = estimated_10k_time * ratio
-        
-        return predicted_time
+            ratio = self._distance_ratio[target_distance] = (target_distance / 10.0) ** 1.06
+        return ratio
     
     def _calculate_training_adaptation(self, fitness_data: Dict, weeks: int, distance: float) -> float:
         """
@@ -242,39 +447,27 @@ class IndustryStandardRacePredictor:
         if weeks <= 0:
             return 0.0
         
+        # Weighted improvement based on energy systems (shared by all athletes), then
+        # fitness level (bonus when already improving) and training volume modifiers
+        return _training_adaptation_core(
+            self._base_improvement(distance, weeks), fitness_data.get('pace_trend', 0),
+            fitness_data['weekly_volume_km'], self._trend_modifiers, self._volume_thresholds, self._volume_modifiers
+        ).item()
+    
+    @classmethod
+    @lru_cache(maxsize=256)
+    def _base_improvement(cls, distance: float, weeks: int) -> float:
+        """
+        Improvement from energy system adaptation alone, before athlete-specific modifiers
+        """
         # Get energy system contributions for target distance
-        energy_contrib = self.energy_systems.get(distance, self.energy_systems[42.195])
-        
-        # Calculate weighted improvement based on energy systems
-        total_improvement = 0.0
-        
-        for system, contribution in energy_contrib.items():
-            if system in self.adaptation_rates:
-                weekly_rate = self.adaptation_rates[system]
-                # Diminishing returns: improvement rate decreases over time
-                system_improvement = 1 - (1 - weekly_rate) ** weeks
-                total_improvement += system_improvement * contribution
-        
-        # Apply fitness level modifier
-        pace_trend = fitness_data.get('pace_trend', 0)
-        if pace_trend > 0:  # Already improving
-            improvement_modifier = 1.2  # 20% bonus for positive trend
-        else:
-            improvement_modifier = 1.0
-        
-        # Apply training volume modifier
-        volume = fitness_data['weekly_volume_km']
-        if volume >= 50:
-            volume_modifier = 1.1
-        elif volume >= 30:
-            volume_modifier = 1.05
-        else:
-            volume_modifier = 1.0
+        contributions = cls._energy_matrix[cls._energy_rows.get(distance, cls._energy_rows[42.195])]
         
-        final_improvement = total_improvement * improvement_modifier * volume_modifier
+        # Diminishing returns: improvement rate decreases over time
+        system_improvements = 1 - (1 - cls._energy_rates) ** weeks
         
-        # Cap maximum improvement at 15% to maintain realism
-        return min(0.15, final_improvement)
+        # Weighted improvement based on energy systems
+        return float(contributions @ system_improvements)
     
     def _apply_riegel_formula(self, base_time: float, improvement: float, distance: float) -> float:
         """
@@ -292,28 +485,24 @@ class IndustryStandardRacePredictor:
         confidence = 0.5  # Base confidence
         
         # Data quality factors
-        if fitness_data['recent_activities_count'] >= 8:
-            confidence += 0.2
-        elif fitness_data['recent_activities_count'] >= 5:
-            confidence += 0.1
+        confidence += self._activity_count_confidence[
+            np.searchsorted(self._activity_count_thresholds, fitness_data['recent_activities_count'], side='right')
+        ]
         
         # Training consistency
-        if fitness_data['training_consistency'] >= 3:
-            confidence += 0.15
-        elif fitness_data['training_consistency'] >= 2:
-            confidence += 0.1
+        confidence += self._consistency_confidence[
+            np.searchsorted(self._consistency_thresholds, fitness_data['training_consistency'], side='right')
+        ]
         
         # Training time available
-        if weeks >= 12:
-            confidence += 0.1
-        elif weeks >= 8:
-            confidence += 0.05
+        confidence += self._weeks_confidence[np.searchsorted(self._weeks_thresholds, weeks, side='right')]
         
         # Volume adequacy
-        if fitness_data['weekly_volume_km'] >= 30:
-            confidence += 0.1
+        confidence += self._volume_confidence[
+            np.searchsorted(self._volume_confidence_thresholds, fitness_data['weekly_volume_km'], side='right')
+        ]
         
-        return min(0.95, confidence)  # Cap at 95%
+        return np.minimum(0.95, confidence)  # Cap at 95%
     
     def _generate_fallback_prediction(self, distance: float) -> Dict:
         """
@@ -332,10 +521,31 @@ class IndustryStandardRacePredictor:
             'warning': 'Insufficient data for accurate prediction'
         }
 
+# Global instance
+industry_standard_predictor = IndustryStandardRacePredictor()
+
 def predict_race_time_industry_standard(db_session: Session, athlete_id: int, 
                                        race_distance_km: float, weeks_to_race: int = 12) -> Dict:
     """
     Global function for industry-standard race prediction
     """
-    predictor = IndustryStandardRacePredictor()
-    return predictor.predict_race_time(db_session, athlete_id, race_distance_km, weeks_to_race)
\ No newline at end of file
+    latest_start = db_session.execute(
+        select(func.max(Activity.start_date)).where(Activity.athlete_id == athlete_id)
+    ).scalar()
+    cache_key = (athlete_id, race_distance_km, weeks_to_race, latest_start)
+    with _prediction_cache_lock:
+        prediction = _prediction_cache.get(cache_key)
+    if prediction is not None:
+        return prediction
+    
+    prediction = industry_standard_predictor.predict_race_time(db_session, athlete_id, race_distance_km, weeks_to_race)
+    with _prediction_cache_lock:
+        _prediction_cache[cache_key] = prediction
+    return prediction
+
+def predict_race_time_industry_standard_many(db_session: Session, athlete_ids: List[int],
+                                            race_distance_km: float, weeks_to_race: int = 12) -> Dict[int, Dict]:
+    """
+    Global function for industry-standard race prediction of several athletes at once
+    """
+    return industry_standard_predictor.predict_race_time_many(db_session, athlete_ids, race_distance_km, weeks_to_race)
@@ -1,6 +1,6 @@
 import datetime
 import json
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, BigInteger, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, BigInteger, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app import db
 
@@ -70,6 +70,16 @@ class ReplitAthlete(db.Model):
 class Activity(db.Model):
     """Enhanced Activity model for detailed data points"""
     __tablename__ = 'activities'
+    __table_args__ = (
+        # Per-athlete date range scans (achievements, dashboards, predictors)
+        Index('ix_activity_athlete_date', 'athlete_id', 'start_date'),
+        # Covers the race predictor's recent-runs filter (sport type, distance, moving time)
+        # so it is answered from the index without reading activity rows
+        Index('ix_activity_athlete_date_run_stats', 'athlete_id', 'start_date', 'sport_type', 'distance',
+              'moving_time'),
+        # Community-wide date range scans across all athletes
+        Index('ix_activity_start_athlete', 'start_date', 'athlete_id'),
+    )
     
     id = Column(Integer, primary_key=True)
     strava_activity_id = Column(BigInteger, unique=True, nullable=False)
@@ -124,6 +134,10 @@ class Activity(db.Model):
 class PlannedWorkout(db.Model):
     """Planned workout model for comparison with actual activities"""
     __tablename__ = 'planned_workouts'
+    __table_args__ = (
+        # Per-athlete planned workout lookups by date
+        Index('ix_planned_workout_athlete_date', 'athlete_id', 'planned_date'),
+    )
     
     id = Column(Integer, primary_key=True)
     athlete_id = Column(Integer, ForeignKey('athletes.id'), nullable=False)
@@ -166,6 +180,10 @@ class PlannedWorkout(db.Model):
 class DailySummary(db.Model):
     """Daily performance summary for each athlete"""
     __tablename__ = 'daily_summaries'
+    __table_args__ = (
+        # One summary per athlete and day; also the conflict target of the daily processing upsert
+        Index('uq_daily_summary_athlete_date', 'athlete_id', 'summary_date', unique=True),
+    )
     
     id = Column(Integer, primary_key=True)
     athlete_id = Column(Integer, ForeignKey('athletes.id'), nullable=False)
@@ -1,10 +1,11 @@
+import json
 import logging
 import os
 from datetime import datetime, timedelta
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
-from app.models import ReplitAthlete, db
+from sqlalchemy import create_engine, insert
+from app.models import ReplitAthlete, SystemLog, db
 from app.data_processor import process_athlete_daily_performance
 from app.mail_notifier import MailNotifier
 from app.config import Config
@@ -65,6 +66,32 @@ class ProcessingWorkflows:
             self.logger.error(f"Error fetching athletes in chunks: {str(e)}")
             raise
     
+    def _system_log_row(self, level, message, athlete_id, context):
+        """Build a SystemLog row for a buffered bulk insert"""
+        return {
+            'timestamp': datetime.now(),
+            'level': level,
+            'message': message,
+            'module': 'processing_workflows',
+            'athlete_id': athlete_id,
+            'context': json.dumps(context)
+        }
+    
+    def write_system_logs(self, db_session_factory, log_rows):
+        """Write buffered SystemLog rows with a single executemany round trip"""
+        if not log_rows:
+            return
+        
+        session = db_session_factory()
+        try:
+            session.execute(insert(SystemLog), log_rows)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            self.logger.error(f"Failed to write {len(log_rows)} system logs: {str(e)}")
+        finally:
+            session.close()
+    
     def process_single_athlete_workflow(self, athlete_data, processing_date, mail_notifier):
         """
         Process a single athlete's data workflow.
@@ -128,27 +155,23 @@ class ProcessingWorkflows:
             else:
                 self.logger.warning(f"No daily summary created for athlete {athlete_id}")
             
-            # Log successful completion
-            from app.models import SystemLog
-            success_log = SystemLog(
-                level='INFO',
-                message=f"Workflow completed successfully for athlete {athlete_name}",
-                module='processing_workflows',
-                athlete_id=athlete_id
+            # Successful completion is logged by the orchestrator in one batch
+            success_log = self._system_log_row(
+                'INFO',
+                f"Workflow completed successfully for athlete {athlete_name}",
+                athlete_id,
+                {
+                    'processing_date': processing_date.isoformat(),
+                    'summary_created': daily_summary is not None,
+                    'email_enabled': preferences.get('notification_daily_summary', False)
+                }
             )
-            success_log.set_context({
-                'processing_date': processing_date.isoformat(),
-                'summary_created': daily_summary is not None,
-                'email_enabled': preferences.get('notification_daily_summary', False)
-            })
-            
-            db_session.add(success_log)
-            db_session.commit()
             
             return {
                 'athlete_id': athlete_id,
                 'status': 'success',
-                'summary_created': daily_summary is not None
+                'summary_created': daily_summary is not None,
+                'log': success_log
             }
             
         except Exception as e:
@@ -157,31 +180,23 @@ class ProcessingWorkflows:
             # Rollback any database changes
             db_session.rollback()
             
-            # Log error to database
-            try:
-                from app.models import SystemLog
-                error_log = SystemLog(
-                    level='ERROR',
-                    message=f"Workflow error for athlete {athlete_name}: {str(e)}",
-                    module='processing_workflows',
-                    athlete_id=athlete_id
-                )
-                error_log.set_context({
+            # Error is logged by the orchestrator in one batch
+            error_log = self._system_log_row(
+                'ERROR',
+                f"Workflow error for athlete {athlete_name}: {str(e)}",
+                athlete_id,
+                {
                     'processing_date': processing_date.isoformat(),
                     'error_type': type(e).__name__,
                     'error_details': str(e)
-                })
-                
-                db_session.add(error_log)
-                db_session.commit()
-                
-            except Exception as log_error:
-                self.logger.error(f"Failed to log error for athlete {athlete_id}: {str(log_error)}")
+                }
+            )
             
             return {
                 'athlete_id': athlete_id,
                 'status': 'error',
-                'error': str(e)
+                'error': str(e),
+                'log': error_log
             }
             
         finally:
@@ -222,6 +237,7 @@ class ProcessingWorkflows:
             # Process athletes in chunks to manage memory
             for athlete_chunk in self.get_athletes_in_chunks(SessionFactory, chunk_size=50):
                 self.logger.info(f"Processing chunk of {len(athlete_chunk)} athletes")
+                chunk_logs = []
                 
                 # Use ThreadPoolExecutor for parallel processing
                 with ThreadPoolExecutor(max_workers=max_workers) as executor:
@@ -242,6 +258,9 @@ class ProcessingWorkflows:
                         
                         try:
                             result = future.result()
+                            if result.get('log'):
+                                chunk_logs.append(result['log'])
+                            
                             if result['status'] == 'success':
                                 success_count += 1
                                 self.logger.info(f"Successfully processed athlete {athlete_id}")
@@ -252,6 +271,9 @@ class ProcessingWorkflows:
                         except Exception as e:
                             error_count += 1
                             self.logger.error(f"Exception processing athlete {athlete_id}: {str(e)}")
+                
+                # Persist the chunk's workflow logs in one bulk insert
+                self.write_system_logs(SessionFactory, chunk_logs)
             
             # Log final results
             self.logger.info(f"Daily processing completed for {processing_date}")
@@ -260,7 +282,6 @@ class ProcessingWorkflows:
             # Log completion to database
             session = SessionFactory()
             try:
-                from app.models import SystemLog
                 completion_log = SystemLog(
                     level='INFO',
                     message=f"Daily processing completed",
@@ -294,7 +315,6 @@ class ProcessingWorkflows:
             # Log critical error
             session = SessionFactory()
             try:
-                from app.models import SystemLog
                 critical_log = SystemLog(
                     level='ERROR',
                     message=f"Critical error in daily processing: {str(e)}",
@@ -117,8 +117,8 @@ class RaceOptimizer:
             if not (activity.distance and activity.moving_time and activity.start_date):
                 continue
             
-            week_start = activity.start_date - timedelta(days=activity.start_date.weekday())
-            week_key = week_start.strftime('%Y-%W')
+            # Integer Monday-based week ordinal (0001-01-01 was a Monday)
+            week_key = (activity.start_date.toordinal() - 1) // 7
             
             distance_km = activity.distance / 1000
             pace_per_km = activity.moving_time / distance_km
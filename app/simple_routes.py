@@ -1,10 +1,12 @@
+import json
 import logging
 import numpy as np
+import orjson
 from datetime import datetime, timedelta
-from flask import Blueprint, request, jsonify, send_from_directory, render_template
+from flask import Blueprint, request, jsonify, send_from_directory, render_template, make_response, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity, create_access_token
-from flask_socketio import emit, join_room, leave_room
-from app import db, socketio
+from werkzeug.exceptions import HTTPException
+from app import db
 from app.models import ReplitAthlete, DailySummary, Activity, PlannedWorkout, SystemLog
 from app.data_processor import get_athlete_performance_summary, get_team_overview
 from app.race_predictor_simple import SimpleRacePredictor
@@ -17,7 +19,8 @@ from app.config import Config
 from app.ai_race_advisor import get_race_recommendations
 from app.training_load_calculator import get_training_load_metrics
 from app.senior_athlete_analytics_simple import get_senior_athlete_analytics_simple
-from app.achievement_system import get_athlete_achievements, get_achievement_stats
+from app.achievement_system import get_athlete_achievements, get_achievement_stats, invalidate_athlete_achievements
+from app.community_analytics import get_enhanced_community_trends, invalidate_community_trends
 from app.training_heatmap_simple import generate_training_heatmap
 
 # Create blueprint for API routes
@@ -29,6 +32,10 @@ main_bp = Blueprint('simple_routes', __name__)
 # Configure logger
 logger = logging.getLogger(__name__)
 
+def _orjson_response(payload):
+    """JSON response serialized with orjson; NumPy arrays and scalars are written without conversion"""
+    return Response(orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY), mimetype='application/json')
+
 @main_bp.route('/')
 def home():
     """Home page redirect to community dashboard"""
@@ -528,18 +535,12 @@ def get_ai_race_recommendations(athlete_id):
                 'training_load': round(training_load, 1),
                 'avg_heart_rate': round(avg_heart_rate, 1) if avg_heart_rate > 0 else 0,
                 'total_time': total_time
-            },
-            'performance_summary': {
-                'activities': [{
-                    'distance': round((a.distance or 0) / 1000, 2),
-                    'moving_time': a.moving_time or 0,
-                    'average_heartrate': a.average_heartrate
-                } for a in recent_activities]
             }
         }
         
-        # Get AI recommendations
-        recommendations = get_race_recommendations(athlete_data, current_activity)
+        # Get AI recommendations; an explicit refresh can bypass the rule-based triage
+        recommendations = get_race_recommendations(athlete_data, current_activity,
+                                                   force_ai=bool(request_data.get('force_ai', False)))
         
         return jsonify({
             'recommendations': recommendations,
@@ -619,6 +620,8 @@ def get_athlete_dashboard_data(athlete_id):
                     
                     if saved_count > 0:
                         db.session.commit()
+                        invalidate_athlete_achievements(athlete_id)
+                        invalidate_community_trends()
                         logger.info(f"Fetched and saved {saved_count} activities for athlete {athlete_id}")
                     else:
                         logger.warning(f"No activities were saved for athlete {athlete_id}")
@@ -814,25 +817,6 @@ def serve_attached_assets(filename):
     import os
     return send_from_directory(os.path.join(os.getcwd(), 'attached_assets'), filename)
 
-# WebSocket event handlers
-@socketio.on('join_dashboard_room')
-def handle_join_dashboard_room(data):
-    """Handle client joining a dashboard room for real-time updates"""
-    try:
-        athlete_id = data.get('athlete_id')
-        if athlete_id:
-            room = f"athlete_{athlete_id}"
-            join_room(room)
-            logger.info(f"Client joined dashboard room for athlete {athlete_id}")
-            emit('status', {'msg': f'Joined room for athlete {athlete_id}'})
-    except Exception as e:
-        logger.error(f"Error joining dashboard room: {str(e)}")
-
-@socketio.on('disconnect')
-def handle_disconnect():
-    """Handle client disconnection"""
-    logger.info("Client disconnected from WebSocket")
-
 # Helper functions for real-time updates
 def send_athlete_update():
     """Sync activities from Strava for all connected athletes (called by scheduler)"""
@@ -958,6 +942,8 @@ def sync_athlete_activities_internal(athlete_id):
         
         if activities_synced > 0:
             db.session.commit()
+            invalidate_athlete_achievements(athlete_id)
+            invalidate_community_trends()
             logger.info(f"Successfully synced {activities_synced} new activities for athlete {athlete_id}")
         
         return {
@@ -1115,6 +1101,9 @@ def sync_athlete_activities(athlete_id):
                 continue
         
         db.session.commit()
+        if activities_synced > 0:
+            invalidate_athlete_achievements(athlete_id)
+            invalidate_community_trends()
         
         logger.info(f"Synced {activities_synced} new activities for athlete {athlete_id}")
         return jsonify({
@@ -1280,7 +1269,6 @@ def get_community_overview():
         training_load_data = [round(distance, 1) for distance in activity_breakdown.values()]
         
         # Enhanced community trends using advanced analytics
-        from app.community_analytics import get_enhanced_community_trends
         enhanced_trends = get_enhanced_community_trends(days=7)
         
         # Extract enhanced metrics for backward compatibility
@@ -1299,7 +1287,7 @@ def get_community_overview():
         consistency_percentage = (sum(1 for val in active_athletes_trend if val > 0) / 7) * 100
         peak_training_day = max(community_tss) if community_tss else 0
         
-        return jsonify({
+        return _orjson_response({
             'kpis': {
                 'totalAthletes': active_athletes,
                 'totalDistance': round(total_distance, 1),
@@ -2008,60 +1996,105 @@ def get_training_load(athlete_id):
         logger.error(f"Error fetching training load: {str(e)}")
         return jsonify({'dates': [], 'loads': []}), 500
 
+def _build_ai_recommendation_inputs(athlete_id):
+    """Build advisor inputs from an athlete's 30 most recent activities; None when there are none"""
+    # Get athlete data
+    athlete = ReplitAthlete.query.get_or_404(athlete_id)
+    
+    # Get recent activities for analysis
+    recent_activities = Activity.query.filter_by(athlete_id=athlete_id)\
+        .order_by(Activity.start_date.desc())\
+        .limit(30).all()
+    
+    if not recent_activities:
+        return None
+    
+    # Calculate athlete metrics
+    total_distance = sum(a.distance or 0 for a in recent_activities) / 1000  # Convert to km
+    valid_pace_activities = [a for a in recent_activities if a.average_speed and a.average_speed > 0]
+    valid_hr_activities = [a for a in recent_activities if a.average_heartrate and a.average_heartrate > 0]
+    
+    # Convert speed (m/s) to pace (min/km): pace = 1000 / (speed_m_s * 60)
+    avg_pace = sum(1000 / (a.average_speed * 60) for a in valid_pace_activities) / len(valid_pace_activities) if valid_pace_activities else 6.5
+    avg_hr = sum(a.average_heartrate for a in valid_hr_activities) / len(valid_hr_activities) if valid_hr_activities else 150
+    
+    athlete_data = {
+        'metrics': {
+            'total_distance': round(total_distance, 1),
+            'total_activities': len(recent_activities),
+            'avg_pace': round(avg_pace, 2),
+            'avg_heart_rate': round(avg_hr, 1),
+            'training_load': 850  # Estimated based on activities
+        }
+    }
+    
+    # Current activity (most recent)
+    latest_activity = recent_activities[0]
+    current_activity = {
+        'distance': (latest_activity.distance or 0) / 1000,
+        'heart_rate': latest_activity.average_heartrate or 150,
+        'pace': 1000 / (latest_activity.average_speed * 60) if latest_activity.average_speed else 6.5
+    }
+    
+    return athlete_data, current_activity
+
 @main_bp.route('/api/ai_recommendations/<int:athlete_id>')
 def get_ai_recommendations(athlete_id):
     """Get AI race recommendations for an athlete"""
     try:
         logger.info(f"Generating AI recommendations for athlete {athlete_id}")
         
-        # Get athlete data
-        athlete = ReplitAthlete.query.get_or_404(athlete_id)
-        
-        # Get recent activities for analysis
-        recent_activities = Activity.query.filter_by(athlete_id=athlete_id)\
-            .order_by(Activity.start_date.desc())\
-            .limit(30).all()
-        
-        if not recent_activities:
+        inputs = _build_ai_recommendation_inputs(athlete_id)
+        if inputs is None:
             return jsonify({'recommendations': ['No recent activity data available for AI analysis']})
+        athlete_data, current_activity = inputs
         
-        # Calculate athlete metrics
-        total_distance = sum(a.distance or 0 for a in recent_activities) / 1000  # Convert to km
-        valid_pace_activities = [a for a in recent_activities if a.average_speed and a.average_speed > 0]
-        valid_hr_activities = [a for a in recent_activities if a.average_heartrate and a.average_heartrate > 0]
-        
-        # Convert speed (m/s) to pace (min/km): pace = 1000 / (speed_m_s * 60)
-        avg_pace = sum(1000 / (a.average_speed * 60) for a in valid_pace_activities) / len(valid_pace_activities) if valid_pace_activities else 6.5
-        avg_hr = sum(a.average_heartrate for a in valid_hr_activities) / len(valid_hr_activities) if valid_hr_activities else 150
-        
-        athlete_data = {
-            'metrics': {
-                'total_distance': round(total_distance, 1),
-                'total_activities': len(recent_activities),
-                'avg_pace': round(avg_pace, 2),
-                'avg_heart_rate': round(avg_hr, 1),
-                'training_load': 850  # Estimated based on activities
-            }
-        }
-        
-        # Current activity (most recent)
-        latest_activity = recent_activities[0]
-        current_activity = {
-            'distance': (latest_activity.distance or 0) / 1000,
-            'heart_rate': latest_activity.average_heartrate or 150,
-            'pace': 1000 / (latest_activity.average_speed * 60) if latest_activity.average_speed else 6.5
-        }
-        
-        # Get AI recommendations
-        from app.ai_race_advisor import get_race_recommendations
-        recommendations = get_race_recommendations(athlete_data, current_activity)
+        # Skip recommendation generation entirely when the client already has this version
+        from app.ai_race_advisor import get_race_recommendations, get_race_recommendations_etag
+        etag = get_race_recommendations_etag(athlete_data, current_activity)
+        if request.if_none_match.contains_weak(etag):
+            response = make_response('', 304)
+        else:
+            # Get AI recommendations
+            recommendations = get_race_recommendations(athlete_data, current_activity)
+            response = make_response(jsonify({'recommendations': recommendations}))
         
-        return jsonify({'recommendations': recommendations})
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, max-age=300'
+        return response
     
     except Exception as e:
         logger.error(f"Error generating AI recommendations: {str(e)}")
         return jsonify({'recommendations': ['AI recommendations temporarily unavailable. Please try again later.']})
 
+@main_bp.route('/api/ai_recommendations/<int:athlete_id>/stream')
+def stream_ai_recommendations(athlete_id):
+    """Stream AI race recommendations for an athlete as server-sent events"""
+    try:
+        inputs = _build_ai_recommendation_inputs(athlete_id)
+    except HTTPException:
+        # Unknown athlete - let get_or_404 answer with a 404 rather than an empty stream
+        raise
+    except Exception as e:
+        logger.error(f"Error preparing AI recommendation stream: {str(e)}")
+        inputs = None
+    
+    def events():
+        if inputs is None:
+            recommendations = iter(['No recent activity data available for AI analysis'])
+        else:
+            from app.ai_race_advisor import stream_race_recommendations
+            recommendations = stream_race_recommendations(*inputs)
+        try:
+            for recommendation in recommendations:
+                yield f"data: {json.dumps(recommendation)}\n\n"
+        except Exception as e:
+            logger.error(f"Error streaming AI recommendations: {str(e)}")
+        yield "event: done\ndata: {}\n\n"
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
+
 # Race Performance Optimization Endpoints
 @api_bp.route('/athletes/<int:athlete_id>/race-prediction', methods=['GET'])
 def get_race_prediction(athlete_id):
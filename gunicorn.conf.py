@@ -0,0 +1,9 @@
+"""
+Gunicorn configuration for the Marathon Training Dashboard.
+Gunicorn loads ./gunicorn.conf.py automatically; command-line flags still take precedence.
+"""
+
+def post_worker_init(worker):
+    """Start the background scheduler once the worker has loaded the app"""
+    from app import start_scheduler
+    start_scheduler(worker.wsgi)
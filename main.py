@@ -1,7 +1,7 @@
 import logging
 import os
 from dotenv import load_dotenv
-from app import create_app, socketio
+from app import create_app, start_scheduler
 
 # Load environment variables from .env file
 load_dotenv()
@@ -16,5 +16,8 @@ if __name__ == "__main__":
     # Get port from environment or default to 5000
     port = int(os.environ.get("PORT", 5000))
     
-    # Start the application with SocketIO
-    socketio.run(app, host="0.0.0.0", port=port, debug=True, use_reloader=False, log_output=True)
+    # Gunicorn starts the scheduler from gunicorn.conf.py; do it here for the dev server
+    start_scheduler(app)
+    
+    # Start the development server
+    app.run(host="0.0.0.0", port=port, debug=True, use_reloader=False)
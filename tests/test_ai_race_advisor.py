@@ -0,0 +1,71 @@
+import pytest
+import sys
+import os
+from types import SimpleNamespace
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.ai_race_advisor import (
+    AIRaceAdvisor, _RACE_MSGS, _HR_MSGS, _LOAD_MSGS
+)
+
+@pytest.fixture
+def advisor(monkeypatch):
+    """Advisor without a Gemini key so only rule-based logic runs"""
+    monkeypatch.delenv('GEMINI_API_KEY', raising=False)
+    return AIRaceAdvisor()
+
+class TestFallbackRecommendations:
+    """Test rule-based race recommendations"""
+
+    def test_marathon_ready_profile(self, advisor):
+        """Test high-volume, fast runners get the marathon recommendation"""
+        athlete_data = {'metrics': {'total_distance': 250, 'avg_pace': 5.0, 'training_load': 900}}
+        current_activity = {'distance': 20, 'heart_rate': 150}
+
+        recommendations = advisor._generate_fallback_recommendations(athlete_data, current_activity)
+
+        assert "🏆" in recommendations[0]
+        assert recommendations[3].startswith("📈")
+
+    def test_beginner_profile(self, advisor):
+        """Test low-volume runners get the 5K recommendation"""
+        athlete_data = {'metrics': {'total_distance': 40, 'avg_pace': 7.5, 'training_load': 100}}
+        current_activity = {'distance': 5, 'heart_rate': 120}
+
+        recommendations = advisor._generate_fallback_recommendations(athlete_data, current_activity)
+
+        assert recommendations[0].startswith("⚡")
+        assert recommendations[1].startswith("💚")
+
+    def test_messages_are_not_mojibake(self):
+        """Test emoji literals are proper UTF-8 rather than Latin-1 decoded bytes"""
+        for message in _RACE_MSGS + _HR_MSGS + _LOAD_MSGS:
+            assert 'ð' not in message
+            assert 'â' not in message
+
+class _FailingModels:
+    """Gemini models stub whose every call fails"""
+
+    def generate_content(self, **kwargs):
+        raise RuntimeError("Gemini unavailable")
+
+class TestGeminiFailure:
+    """Test rule-based advice stands in for failed Gemini calls without being cached"""
+
+    def test_fallback_is_per_athlete_and_not_cached(self, advisor):
+        """Test athletes sharing a cache bucket each get their own fallback advice"""
+        advisor._client = SimpleNamespace(models=_FailingModels())
+        athlete_a = ({'metrics': {'total_distance': 215, 'avg_pace': 5.5, 'training_load': 900}}, {})
+        athlete_b = ({'metrics': {'total_distance': 216, 'avg_pace': 5.6, 'training_load': 100}},
+                     {'heart_rate': 180})
+        assert advisor._create_data_fingerprint(*athlete_a) == advisor._create_data_fingerprint(*athlete_b)
+
+        first = advisor.generate_race_recommendations(*athlete_a, force_ai=True)
+        second = advisor.generate_race_recommendations(*athlete_b, force_ai=True)
+
+        assert first == advisor._generate_fallback_recommendations(*athlete_a)
+        assert second == advisor._generate_fallback_recommendations(*athlete_b)
+        assert first != second
+        assert len(advisor._recommendation_cache) == 0
@@ -14,7 +14,7 @@ from app.models import (
     SystemLog, StravaApiUsage, OptimalValues
 )
 from app.data_processor import (
-    DataProcessor, process_athlete_daily_performance,
+    DataProcessor, DailyMetrics, ComplianceMetrics, process_athlete_daily_performance,
     get_athlete_performance_summary, get_team_overview
 )
 from app.processing_workflows import ProcessingWorkflows
@@ -171,12 +171,12 @@ class TestDataProcessor:
             test_day_activities = test_activities[:3]
             metrics = processor._calculate_daily_metrics(test_day_activities)
             
-            assert metrics['activity_count'] == 3
-            assert metrics['total_distance'] > 0
-            assert metrics['total_moving_time'] > 0
-            assert metrics['average_pace'] is not None
-            assert metrics['average_heart_rate'] is not None
-            assert metrics['training_load'] > 0
+            assert metrics.activity_count == 3
+            assert metrics.total_distance > 0
+            assert metrics.total_moving_time > 0
+            assert metrics.average_pace is not None
+            assert metrics.average_heart_rate is not None
+            assert metrics.training_load > 0
     
     def test_calculate_daily_metrics_empty(self, app):
         """Test daily metrics calculation with no activities"""
@@ -184,12 +184,12 @@ class TestDataProcessor:
             processor = DataProcessor()
             metrics = processor._calculate_daily_metrics([])
             
-            assert metrics['activity_count'] == 0
-            assert metrics['total_distance'] == 0.0
-            assert metrics['total_moving_time'] == 0
-            assert metrics['average_pace'] is None
-            assert metrics['average_heart_rate'] is None
-            assert metrics['training_load'] == 0.0
+            assert metrics.activity_count == 0
+            assert metrics.total_distance == 0.0
+            assert metrics.total_moving_time == 0
+            assert metrics.average_pace is None
+            assert metrics.average_heart_rate is None
+            assert metrics.training_load == 0.0
     
     def test_calculate_compliance_metrics_with_plan(self, app, test_planned_workouts):
         """Test compliance metrics calculation with planned workout"""
@@ -197,27 +197,27 @@ class TestDataProcessor:
             processor = DataProcessor()
             
             # Mock daily metrics
-            daily_metrics = {
-                'total_distance': 8500,  # Slightly more than planned 8000
-                'total_moving_time': 2500  # Slightly more than planned 2400
-            }
+            daily_metrics = DailyMetrics(
+                total_distance=8500,  # Slightly more than planned 8000
+                total_moving_time=2500  # Slightly more than planned 2400
+            )
             
             planned_workout = test_planned_workouts[1]  # Tempo run
             compliance = processor._calculate_compliance_metrics(daily_metrics, planned_workout)
             
-            assert compliance['planned_vs_actual_distance'] > 100  # Over 100%
-            assert compliance['planned_vs_actual_duration'] > 100  # Over 100%
+            assert compliance.planned_vs_actual_distance > 100  # Over 100%
+            assert compliance.planned_vs_actual_duration > 100  # Over 100%
     
     def test_calculate_compliance_metrics_no_plan(self, app):
         """Test compliance metrics with no planned workout"""
         with app.app_context():
             processor = DataProcessor()
             
-            daily_metrics = {'total_distance': 5000, 'total_moving_time': 1800}
+            daily_metrics = DailyMetrics(total_distance=5000, total_moving_time=1800)
             compliance = processor._calculate_compliance_metrics(daily_metrics, None)
             
-            assert compliance['planned_vs_actual_distance'] is None
-            assert compliance['planned_vs_actual_duration'] is None
+            assert compliance.planned_vs_actual_distance is None
+            assert compliance.planned_vs_actual_duration is None
     
     def test_determine_status_variations(self, app, test_planned_workouts):
         """Test status determination for various scenarios"""
@@ -226,23 +226,23 @@ class TestDataProcessor:
             planned_workout = test_planned_workouts[0]
             
             # Test "On Track" status
-            daily_metrics = {'activity_count': 1}
-            compliance = {'planned_vs_actual_distance': 95, 'planned_vs_actual_duration': 98}
+            daily_metrics = DailyMetrics(activity_count=1)
+            compliance = ComplianceMetrics(planned_vs_actual_distance=95, planned_vs_actual_duration=98)
             status = processor._determine_status(daily_metrics, compliance, planned_workout)
             assert status == "On Track"
             
             # Test "Under-performed" status
-            compliance = {'planned_vs_actual_distance': 60, 'planned_vs_actual_duration': 65}
+            compliance = ComplianceMetrics(planned_vs_actual_distance=60, planned_vs_actual_duration=65)
             status = processor._determine_status(daily_metrics, compliance, planned_workout)
             assert status == "Under-performed"
             
             # Test "Rest Day" status
-            daily_metrics = {'activity_count': 0}
-            status = processor._determine_status(daily_metrics, {}, None)
+            daily_metrics = DailyMetrics(activity_count=0)
+            status = processor._determine_status(daily_metrics, ComplianceMetrics(), None)
             assert status == "Rest Day"
             
             # Test "Missed Workout" status
-            status = processor._determine_status(daily_metrics, {}, planned_workout)
+            status = processor._determine_status(daily_metrics, ComplianceMetrics(), planned_workout)
             assert status == "Missed Workout"
     
     def test_generate_insights(self, app, test_athlete):
@@ -251,13 +251,13 @@ class TestDataProcessor:
             processor = DataProcessor()
             
             # Test high training load insights
-            daily_metrics = {
-                'training_load': 180,
-                'total_distance': 15000,
-                'average_pace': 300,  # 5 min/km
-                'average_heart_rate': 180
-            }
-            compliance = {'planned_vs_actual_distance': 110}
+            daily_metrics = DailyMetrics(
+                training_load=180,
+                total_distance=15000,
+                average_pace=300,  # 5 min/km
+                average_heart_rate=180
+            )
+            compliance = ComplianceMetrics(planned_vs_actual_distance=110)
             
             insights = processor._generate_insights(daily_metrics, compliance, test_athlete)
             
@@ -532,11 +532,11 @@ class TestDataValidationAndErrorHandling:
             
             # Test with empty activities list
             metrics = processor._calculate_daily_metrics([])
-            assert metrics['activity_count'] == 0
+            assert metrics.activity_count == 0
             
             # Test compliance with None planned workout
             compliance = processor._calculate_compliance_metrics(metrics, None)
-            assert compliance['planned_vs_actual_distance'] is None
+            assert compliance.planned_vs_actual_distance is None
 
 class TestPerformanceOptimization:
     """Test performance optimization features"""